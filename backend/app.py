@@ -2,10 +2,15 @@
 FastAPI Backend for ICD-10-AM & ACHI Code Validation
 Professional medical code validation with RAG-enhanced AI
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional
+from typing import Callable, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import hashlib
+import json
 import os
 import sys
 from pathlib import Path
@@ -19,12 +24,27 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 # Import our modules
 from database.queries import db_manager
+from database.async_access import AsyncDatabaseManager
 from validators.rag_validator import rag_validator
 from validators.hierarchical_validator import HierarchicalValidator
 
 # Initialize validators
 hierarchical_validator = HierarchicalValidator()
 
+# Blocking work stays off the event loop: SQLite calls on the database
+# executor, /api/validate model calls through the async OpenAI client, and the
+# remaining blocking validators (hierarchical) on their own threads so a burst
+# of them can't delay searches
+async_db = AsyncDatabaseManager(db_manager)
+validation_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('VALIDATION_WORKERS', 8)), thread_name_prefix='validate'
+)
+
+async def run_validation(fn: Callable, *args):
+    """Await a blocking validator call on the validation executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(validation_executor, functools.partial(fn, *args))
+
 # Initialize FastAPI app
 app = FastAPI(
     title="ICD-10-AM & ACHI Validation API",
@@ -61,6 +81,13 @@ class ValidationResponse(BaseModel):
     similar_examples_count: int = 0
     hierarchical_context: Optional[bool] = False
 
+class BatchValidationRequest(BaseModel):
+    pairs: List[ValidationRequest]
+
+class CodeLookupRequest(BaseModel):
+    icd_codes: List[str] = []
+    achi_codes: List[str] = []
+
 class SearchResult(BaseModel):
     code: str
     description: str
@@ -74,7 +101,36 @@ async def startup_event():
     """
     try:
         db_manager.connect()
-        print(f"✓ Database connected: {db_manager.db_path}")
+        print(f"✓ Database connected: {db_manager.db_path} ({db_manager.profile_name} profile)")
+        
+        # Indexes and columns added since the database was built, applied in place
+        migrations = db_manager.apply_migrations()
+        if migrations:
+            print(f"✓ Schema migrations applied: {', '.join(migrations)}")
+        
+        warmed = db_manager.warm_page_cache()
+        if warmed:
+            print(f"✓ Page cache warmed: {warmed / (1024 * 1024):.1f} MB")
+        
+        icd_count, achi_count = db_manager.load_code_indexes()
+        print(f"✓ Code prefix indexes loaded: {icd_count} ICD, {achi_count} ACHI")
+        
+        store_counts = db_manager.load_reference_store()
+        print(f"✓ Reference store loaded: {store_counts['icd']} ICD, {store_counts['achi']} ACHI codes "
+              f"({db_manager.reference_store.memory_bytes() / (1024 * 1024):.1f} MB)")
+        
+        vocabulary_size = db_manager.load_trigram_index()
+        print(f"✓ Fuzzy search vocabulary loaded: {vocabulary_size} words")
+        
+        synonym_count = db_manager.load_synonyms(os.getenv('SYNONYMS_PATH'))
+        print(f"✓ Clinical synonyms loaded: {synonym_count} terms")
+        
+        popular_count = db_manager.load_popularity(int(os.getenv('POPULAR_CODES_LIMIT', 5000)))
+        print(f"✓ Popular codes loaded: {popular_count} codes")
+        
+        pruned = db_manager.prune_validation_cache()
+        if pruned:
+            print(f"✓ Expired validation results pruned: {pruned}")
     except Exception as e:
         print(f"✗ Database connection error: {e}")
         print("Please run: python utils/database_setup.py")
@@ -85,6 +141,8 @@ async def shutdown_event():
     """
     Close database connection on shutdown
     """
+    async_db.shutdown()
+    validation_executor.shutdown(wait=False)
     db_manager.close()
     print("✓ Database connection closed")
 
@@ -101,9 +159,15 @@ async def root():
         "docs": "/docs",
         "endpoints": {
             "health": "/health",
+            "search": "/api/search?q={query}",
+            "search_ws": "/ws/search",
             "search_icd": "/api/search/icd/{query}",
             "search_achi": "/api/search/achi/{query}",
-            "validate": "/api/validate"
+            "search_stats": "/api/search/stats",
+            "codes_lookup": "/api/codes/lookup",
+            "validate": "/api/validate",
+            "validate_batch": "/api/validate/batch",
+            "validate_stats": "/api/validate/stats"
         }
     }
 
@@ -115,31 +179,195 @@ async def health():
     try:
         # Test database connection
         if not db_manager.conn:
-            db_manager.connect()
+            await async_db.run(db_manager.connect)
         
         # Test query
-        result = db_manager.search_icd_codes("A", limit=1)
+        result = await async_db.search_icd_codes("A", limit=1)
         
         return {
             "status": "healthy",
             "database": "connected",
+            "database_pool": db_manager.pool.stats(),
+            "database_executor": async_db.stats(),
             "model": "gpt-4.1-mini",
             "api_key": "configured" if os.getenv('OPENAI_API_KEY') else "missing"
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Health check failed: {str(e)}")
 
+# Seconds clients/proxies may reuse a search response before revalidating
+SEARCH_CACHE_MAX_AGE = int(os.getenv('SEARCH_CACHE_MAX_AGE', 300))
+
+def check_not_modified(request: Request, response: Response) -> Optional[Response]:
+    """
+    Conditional GET for search responses
+    The ETag hashes the dataset/synonym version with the request URL, so it
+    only changes when the database is rebuilt. Sets ETag/Cache-Control on
+    response and returns a 304 when If-None-Match already has this version.
+    """
+    key = f"{db_manager.search_version}:{request.url.path}?{request.url.query}"
+    etag = '"' + hashlib.sha256(key.encode('utf-8')).hexdigest()[:20] + '"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={SEARCH_CACHE_MAX_AGE}"}
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    # Weak comparison: W/"x" matches "x"
+    client_tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if "*" in client_tags or etag in client_tags:
+        return Response(status_code=304, headers=headers)
+    
+    response.headers.update(headers)
+    return None
+
+def search_with_fuzzy_fallback(search_fn, query: str, limit: int, fuzzy: bool = False,
+                               superseded: Optional[Callable[[], bool]] = None):
+    """
+    Run an autocomplete search, retrying with typo-tolerant matching
+    when nothing matches (fuzzy=True skips straight to it)
+    The retry is skipped once superseded() reports a newer query
+    """
+    results = [] if fuzzy else search_fn(query, limit=limit)
+    if not results and not (superseded and superseded()):
+        results = search_fn(query, limit=limit, fuzzy=True)
+    return results
+
+async def unified_search(q: str, limit: int = 20, fuzzy: bool = False,
+                         superseded: Optional[Callable[[], bool]] = None) -> Dict:
+    """
+    Query ICD-10-AM and ACHI concurrently and merge the typed results
+    ICD and ACHI rows are interleaved by rank so both show up at the top
+    """
+    if len(q.strip()) < 1:
+        return {"query": q, "results": [], "icd_count": 0, "achi_count": 0}
+    
+    icd_results, achi_results = await asyncio.gather(
+        async_db.run(search_with_fuzzy_fallback, db_manager.search_icd_codes, q, limit, fuzzy, superseded),
+        async_db.run(search_with_fuzzy_fallback, db_manager.search_achi_codes_v2, q, limit, fuzzy, superseded)
+    )
+    
+    typed_icd = [
+        {"type": "icd", "code": r['code'], "description": r['description'], "category": None}
+        for r in icd_results
+    ]
+    typed_achi = [
+        {"type": "achi", "code": r['code'], "description": r['description'], "category": r.get('category', '')}
+        for r in achi_results
+    ]
+    
+    merged = []
+    for rank in range(max(len(typed_icd), len(typed_achi))):
+        merged.extend(typed_icd[rank:rank + 1])
+        merged.extend(typed_achi[rank:rank + 1])
+    
+    return {
+        "query": q,
+        "results": merged,
+        "icd_count": len(typed_icd),
+        "achi_count": len(typed_achi)
+    }
+
+@app.get("/api/search")
+async def search_all(
+    request: Request,
+    response: Response,
+    q: str,
+    fuzzy: bool = False,
+    limit: int = Query(20, ge=1, le=100)
+):
+    """
+    Search ICD-10-AM and ACHI codes in one request
+    Both vocabularies are queried concurrently; results are merged by rank
+    (ICD and ACHI interleaved) and typed with "type": "icd" | "achi"
+    """
+    try:
+        not_modified = check_not_modified(request, response)
+        if not_modified:
+            return not_modified
+        
+        return await unified_search(q, limit, fuzzy)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
+
+@app.websocket("/ws/search")
+async def search_websocket(websocket: WebSocket):
+    """
+    Search-as-you-type channel
+    Clients send {"q": ..., "limit": ..., "fuzzy": ..., "seq": ...} on every
+    keystroke and receive the /api/search response (with seq echoed) for the
+    latest query only. Each client has at most one search in flight; queries
+    that arrive meanwhile replace each other and only the newest one runs.
+    """
+    await websocket.accept()
+    latest = {"message": None, "seq": 0}
+    pending = asyncio.Event()
+    
+    async def run_searches():
+        while True:
+            await pending.wait()
+            pending.clear()
+            message, seq = latest["message"], latest["seq"]
+            superseded = lambda: latest["seq"] != seq
+            try:
+                limit = min(max(int(message.get("limit", 20)), 1), 100)
+                response = await unified_search(
+                    str(message.get("q", "")), limit, bool(message.get("fuzzy", False)), superseded
+                )
+            except Exception as e:
+                response = {"query": message.get("q"), "error": f"Search error: {str(e)}"}
+            
+            # Drop results for a query the client has already typed past
+            if superseded():
+                continue
+            response["seq"] = message.get("seq")
+            await websocket.send_json(response)
+    
+    worker = asyncio.create_task(run_searches())
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                message = None
+            if not isinstance(message, dict):
+                await websocket.send_json({"error": "Expected a JSON object with a \"q\" field"})
+                continue
+            latest["message"] = message
+            latest["seq"] += 1
+            pending.set()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        worker.cancel()
+
 @app.get("/api/search/icd/{query}")
-async def search_icd(query: str):
+async def search_icd(
+    request: Request,
+    response: Response,
+    query: str,
+    fuzzy: bool = False,
+    limit: int = Query(20, ge=1, le=100),
+    paginate: bool = False,
+    cursor: Optional[str] = None
+):
     """
     Search ICD-10-AM codes for autocomplete
-    Returns top 20 matching codes
+    Returns top 20 matching codes (or `limit`)
+    Falls back to typo-tolerant matching when nothing matches (or fuzzy=true)
+    
+    Pagination mode (paginate=true or a cursor): results ordered by code as
+    {"results": [...], "next_cursor": "..."}; pass next_cursor to get the next page
     """
     try:
+        not_modified = check_not_modified(request, response)
+        if not_modified:
+            return not_modified
+        
+        if paginate or cursor:
+            return await async_db.search_icd_codes_page(query, limit=limit, cursor=cursor)
+        
         if len(query) < 1:
             return []
         
-        results = db_manager.search_icd_codes(query, limit=20)
+        results = await async_db.run(search_with_fuzzy_fallback, db_manager.search_icd_codes, query, limit, fuzzy)
         
         return [
             {
@@ -148,21 +376,42 @@ async def search_icd(query: str):
             }
             for r in results
         ]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
 
 @app.get("/api/search/achi/{query}")
-async def search_achi(query: str):
+async def search_achi(
+    request: Request,
+    response: Response,
+    query: str,
+    fuzzy: bool = False,
+    limit: int = Query(20, ge=1, le=100),
+    paginate: bool = False,
+    cursor: Optional[str] = None
+):
     """
     Search ACHI codes for autocomplete using hierarchical v2 table
-    Returns top 20 matching codes with hierarchical context
+    Returns top 20 matching codes (or `limit`) with hierarchical context
+    Falls back to typo-tolerant matching when nothing matches (or fuzzy=true)
+    
+    Pagination mode (paginate=true or a cursor): results ordered by code as
+    {"results": [...], "next_cursor": "..."}; pass next_cursor to get the next page
     """
     try:
+        not_modified = check_not_modified(request, response)
+        if not_modified:
+            return not_modified
+        
+        if paginate or cursor:
+            return await async_db.search_achi_codes_v2_page(query, limit=limit, cursor=cursor)
+        
         if len(query) < 1:
             return []
         
         # Use v2 table for hierarchical search
-        results = db_manager.search_achi_codes_v2(query, limit=20)
+        results = await async_db.run(search_with_fuzzy_fallback, db_manager.search_achi_codes_v2, query, limit, fuzzy)
         
         return [
             {
@@ -172,29 +421,78 @@ async def search_achi(query: str):
             }
             for r in results
         ]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
 
-@app.post("/api/validate", response_model=ValidationResponse)
-async def validate_codes(request: ValidationRequest):
+@app.get("/api/search/stats")
+async def search_stats():
     """
-    Validate ICD-10-AM and ACHI code pairing
+    Autocomplete search cache counters (hits, narrowed hits, misses, evictions)
+    and query router counts/latency per query class (icd_code, achi_code, text)
+    """
+    return {
+        "cache": db_manager.search_cache.stats(),
+        "router": db_manager.router.stats()
+    }
+
+# Most codes one /api/codes/lookup request may resolve (ICD + ACHI)
+MAX_LOOKUP_CODES = int(os.getenv('MAX_LOOKUP_CODES', 1000))
+
+def order_lookup_results(codes: List[str], found: Dict[str, Dict]) -> Dict:
+    """
+    Records for the requested codes in input order (first occurrence) plus
+    the requested codes that don't exist, as sent
+    """
+    results, unknown, seen = [], [], set()
+    for code in codes:
+        key = code.strip().upper()
+        if key in seen:
+            continue
+        seen.add(key)
+        if key in found:
+            results.append(found[key])
+        else:
+            unknown.append(code)
+    return {"results": results, "unknown": unknown}
+
+@app.post("/api/codes/lookup")
+async def lookup_codes(request: CodeLookupRequest):
+    """
+    Resolve many ICD-10-AM / ACHI codes in one round trip
     
-    Uses RAG-enhanced validation:
-    1. Check exact match in database (instant, 100% accurate)
-    2. Retrieve similar examples from same categories
-    3. AI validates using examples as context
+    ICD codes come back with their category, ACHI codes with their hierarchy
+    (main / sub category), each list in input order. Codes that don't exist
+    are listed under "unknown". Codes are matched case-insensitively.
+    """
+    if len(request.icd_codes) + len(request.achi_codes) > MAX_LOOKUP_CODES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_LOOKUP_CODES} codes per lookup")
     
-    Returns validation result with REAL confidence scores
+    try:
+        icd_found, achi_found = await asyncio.gather(
+            async_db.get_icd_codes_with_category([code.strip().upper() for code in request.icd_codes]),
+            async_db.get_achi_codes_with_hierarchy([code.strip().upper() for code in request.achi_codes])
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Lookup error: {str(e)}")
     
-    AUTO-LOGS unique test results to validation_test_log table
+    icd = order_lookup_results(request.icd_codes, icd_found)
+    achi = order_lookup_results(request.achi_codes, achi_found)
+    return {
+        "icd": icd["results"],
+        "achi": achi["results"],
+        "unknown": {"icd": icd["unknown"], "achi": achi["unknown"]}
+    }
+
+def log_validation_result(icd_code: str, achi_code: str, result: Dict):
+    """
+    Record a validation in validation_test_log (unique pairs) and code_usage
+    Blocking; the endpoint runs it on the database executor
     """
     try:
-        # Validate using RAG validator
-        result = rag_validator.validate(request.icd_code, request.achi_code)
-        
-        # AUTO-LOG UNIQUE TEST RESULTS (no duplicates)
-        try:
+        # The immutable profile promises SQLite nobody writes while serving
+        if db_manager.writes_enabled:
             import sqlite3
             from pathlib import Path
             
@@ -212,31 +510,62 @@ async def validate_codes(request: ValidationRequest):
                 (icd_code, achi_code, ai_decision, ai_confidence_percent, ai_reasoning)
                 VALUES (?, ?, ?, ?, ?)
             """, (
-                request.icd_code,
-                request.achi_code,
+                icd_code,
+                achi_code,
                 "Valid" if result['is_valid'] else "Invalid",
                 result['confidence'] * 100,  # Convert 0.75 → 75.0
                 result['reasoning']
             ))
             conn.commit()
             conn.close()
-        except Exception as log_error:
-            # Non-blocking - don't fail validation if logging fails
-            print(f"[LOG WARNING] Failed to log test result: {log_error}")
+            
+            # Popularity ranking counts every validation, not just unique pairs,
+            # but only answered ones for codes that exist (errors rank nothing)
+            if result.get('source') != 'error' and result.get('icd_description') \
+                    and result.get('achi_description'):
+                db_manager.record_code_usage(icd_code, achi_code)
+    except Exception as log_error:
+        # Non-blocking - don't fail validation if logging fails
+        print(f"[LOG WARNING] Failed to log test result: {log_error}")
+
+def validation_response(icd_code: str, achi_code: str, result: Dict) -> ValidationResponse:
+    """API response for a validator result"""
+    return ValidationResponse(
+        icd_code=icd_code,
+        icd_description=result.get('icd_description', ''),
+        achi_code=achi_code,
+        achi_description=result.get('achi_description', ''),
+        is_valid=result['is_valid'],
+        reasoning=result['reasoning'],
+        confidence=result['confidence'],
+        certainty_explanation=result['certainty_explanation'],
+        source=result['source'],
+        similar_examples_count=result['similar_examples_count']
+    )
+
+@app.post("/api/validate", response_model=ValidationResponse)
+async def validate_codes(request: ValidationRequest):
+    """
+    Validate ICD-10-AM and ACHI code pairing
+    
+    Uses RAG-enhanced validation:
+    1. Check exact match in database (instant, 100% accurate)
+    2. Retrieve similar examples from same categories
+    3. AI validates using examples as context
+    
+    Returns validation result with REAL confidence scores
+    
+    AUTO-LOGS unique test results to validation_test_log table
+    """
+    try:
+        # Validate using RAG validator (database steps on the database executor, async model call)
+        result = await rag_validator.avalidate(request.icd_code, request.achi_code, async_db.run)
+        
+        # AUTO-LOG UNIQUE TEST RESULTS (no duplicates)
+        await async_db.run(log_validation_result, request.icd_code, request.achi_code, result)
         
         # Return response
-        return ValidationResponse(
-            icd_code=request.icd_code,
-            icd_description=result.get('icd_description', ''),
-            achi_code=request.achi_code,
-            achi_description=result.get('achi_description', ''),
-            is_valid=result['is_valid'],
-            reasoning=result['reasoning'],
-            confidence=result['confidence'],
-            certainty_explanation=result['certainty_explanation'],
-            source=result['source'],
-            similar_examples_count=result['similar_examples_count']
-        )
+        return validation_response(request.icd_code, request.achi_code, result)
     
     except Exception as e:
         raise HTTPException(
@@ -244,6 +573,76 @@ async def validate_codes(request: ValidationRequest):
             detail=f"Validation error: {str(e)}"
         )
 
+@app.get("/api/validate/stats")
+async def validate_stats():
+    """
+    Validation result caches: in-memory (entries, approximate bytes,
+    hit/miss/expiry/eviction counters) and persistent (hits, misses, stores),
+    request coalescing (validations run vs. served from one in flight) and
+    async model calls (running and queued under LLM_CONCURRENCY)
+    """
+    return {
+        "cache": rag_validator.cache.stats(),
+        "persistent_cache": rag_validator.persistent_cache.stats(),
+        "coalescing": rag_validator.in_flight.stats(),
+        "llm": rag_validator.llm_stats()
+    }
+
+MAX_BATCH_PAIRS = int(os.getenv('MAX_BATCH_PAIRS', 50000))
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 32))
+
+@app.post("/api/validate/batch")
+async def validate_batch(request: BatchValidationRequest):
+    """
+    Validate many ICD-10-AM / ACHI pairs in one request (audits)
+    
+    Duplicate pairs (codes matched case-insensitively) are validated once.
+    Cached results and database answers come first, the remaining pairs go
+    to the AI with at most BATCH_CONCURRENCY in progress. Results are in
+    input order; a pair that fails (unknown code, AI error) gets an "error"
+    instead of a verdict, without failing the batch. Batch validations are
+    not written to validation_test_log.
+    """
+    if len(request.pairs) > MAX_BATCH_PAIRS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_PAIRS} pairs per batch")
+    
+    # Distinct pairs in first-seen order, and each input pair's position among them
+    unique, positions = {}, []
+    for pair in request.pairs:
+        key = (pair.icd_code.strip().upper(), pair.achi_code.strip().upper())
+        positions.append(unique.setdefault(key, len(unique)))
+    
+    try:
+        outcomes = await rag_validator.avalidate_batch(list(unique), async_db.run, BATCH_CONCURRENCY)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch validation error: {str(e)}")
+    
+    results = []
+    for pair, position in zip(request.pairs, positions):
+        outcome = outcomes[position]
+        if 'error' in outcome:
+            results.append({"icd_code": pair.icd_code, "achi_code": pair.achi_code, "error": outcome['error']})
+            continue
+        try:
+            results.append(validation_response(pair.icd_code, pair.achi_code, outcome['result']))
+        except (KeyError, ValueError) as e:
+            # Malformed model answer (missing or mistyped fields)
+            results.append({"icd_code": pair.icd_code, "achi_code": pair.achi_code,
+                            "error": f"Invalid validation result: {e}"})
+    
+    resolved = [outcome.get('resolved_by', 'error') for outcome in outcomes]
+    return {
+        "results": results,
+        "summary": {
+            "pairs": len(request.pairs),
+            "unique": len(unique),
+            "cache": resolved.count('cache'),
+            "database": resolved.count('database'),
+            "model": resolved.count('model'),
+            "errors": resolved.count('error')
+        }
+    }
+
 @app.post("/api/validate/hierarchical", response_model=ValidationResponse)
 async def validate_codes_hierarchical(request: ValidationRequest):
     """
@@ -258,8 +657,10 @@ async def validate_codes_hierarchical(request: ValidationRequest):
     """
     try:
         # Get code descriptions first
-        icd_data = db_manager.get_icd_with_category(request.icd_code)
-        achi_data = db_manager.get_achi_with_hierarchy(request.achi_code)
+        icd_data, achi_data = await asyncio.gather(
+            async_db.get_icd_with_category(request.icd_code),
+            async_db.get_achi_with_hierarchy(request.achi_code)
+        )
         
         if not icd_data:
             raise HTTPException(status_code=404, detail=f"ICD code {request.icd_code} not found")
@@ -268,7 +669,8 @@ async def validate_codes_hierarchical(request: ValidationRequest):
             raise HTTPException(status_code=404, detail=f"ACHI code {request.achi_code} not found")
         
         # Use hierarchical validator
-        result = hierarchical_validator.validate_with_hierarchy(
+        result = await run_validation(
+            hierarchical_validator.validate_with_hierarchy,
             request.icd_code, 
             icd_data['description'],
             request.achi_code, 
@@ -278,6 +680,11 @@ async def validate_codes_hierarchical(request: ValidationRequest):
         # Convert result format
         is_valid, confidence, reasoning = result
         
+        try:
+            await async_db.record_code_usage(request.icd_code, request.achi_code)
+        except Exception as log_error:
+            print(f"[LOG WARNING] Failed to record code usage: {log_error}")
+        
         return ValidationResponse(
             icd_code=request.icd_code,
             icd_description=icd_data['description'],
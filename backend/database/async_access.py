@@ -0,0 +1,70 @@
+"""
+Async Database Access
+Awaitable DatabaseManager calls for the async FastAPI endpoints
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+class AsyncDatabaseManager:
+    """
+    Runs DatabaseManager calls on a dedicated thread pool
+
+    SQLite calls block, so awaiting them here keeps the event loop free for
+    other requests. The executor is sized to the connection pool
+    (DB_EXECUTOR_WORKERS, default DB_POOL_SIZE) and is not shared with
+    validations, so slow LLM calls can't hold up searches.
+    """
+    def __init__(self, manager, max_workers: Optional[int] = None):
+        self.manager = manager
+        self.max_workers = max_workers or int(os.getenv('DB_EXECUTOR_WORKERS', os.getenv('DB_POOL_SIZE', 4)))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='db')
+        self.in_flight = 0
+        self.calls = 0
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Await fn(*args, **kwargs) on the database executor"""
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        self.calls += 1
+        try:
+            return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self.in_flight -= 1
+
+    async def search_icd_codes(self, query_str: str, limit: int = 20, fuzzy: bool = False) -> List[Dict]:
+        return await self.run(self.manager.search_icd_codes, query_str, limit=limit, fuzzy=fuzzy)
+
+    async def search_achi_codes_v2(self, query_str: str, limit: int = 20, fuzzy: bool = False) -> List[Dict]:
+        return await self.run(self.manager.search_achi_codes_v2, query_str, limit=limit, fuzzy=fuzzy)
+
+    async def search_icd_codes_page(self, query_str: str, limit: int = 20, cursor: Optional[str] = None) -> Dict:
+        return await self.run(self.manager.search_icd_codes_page, query_str, limit=limit, cursor=cursor)
+
+    async def search_achi_codes_v2_page(self, query_str: str, limit: int = 20, cursor: Optional[str] = None) -> Dict:
+        return await self.run(self.manager.search_achi_codes_v2_page, query_str, limit=limit, cursor=cursor)
+
+    async def get_icd_with_category(self, icd_code: str) -> Optional[Dict]:
+        return await self.run(self.manager.get_icd_with_category, icd_code)
+
+    async def get_achi_with_hierarchy(self, achi_code: str) -> Optional[Dict]:
+        return await self.run(self.manager.get_achi_with_hierarchy, achi_code)
+
+    async def get_icd_codes_with_category(self, icd_codes: List[str]) -> Dict[str, Dict]:
+        return await self.run(self.manager.get_icd_codes_with_category, icd_codes)
+
+    async def get_achi_codes_with_hierarchy(self, achi_codes: List[str]) -> Dict[str, Dict]:
+        return await self.run(self.manager.get_achi_codes_with_hierarchy, achi_codes)
+
+    async def record_code_usage(self, icd_code: str, achi_code: str):
+        return await self.run(self.manager.record_code_usage, icd_code, achi_code)
+
+    def stats(self) -> Dict:
+        """Executor size, calls awaiting or running now, calls so far"""
+        return {'workers': self.max_workers, 'in_flight': self.in_flight, 'calls': self.calls}
+
+    def shutdown(self):
+        """Stop accepting calls (running ones finish in the background)"""
+        self.executor.shutdown(wait=False)
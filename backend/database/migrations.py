@@ -0,0 +1,100 @@
+"""
+Schema Migrations
+Ordered changes applied to a live database in place, recorded in schema_version
+"""
+import sqlite3
+from datetime import datetime
+from typing import Dict, List
+
+from database.schema import (
+    FTS_TABLES, _table_exists, build_achi_search_table, build_code_usage_table, build_fts_indexes,
+    build_icd_category_column, build_relationship_indexes, build_trigram_index, build_validation_result_cache
+)
+
+def _achi_search(cursor):
+    if not _table_exists(cursor, 'achi_search'):
+        build_achi_search_table(cursor)
+
+def _fts_indexes(cursor):
+    if not all(_table_exists(cursor, fts_table) for fts_table in FTS_TABLES):
+        build_fts_indexes(cursor)
+
+def _trigram_index(cursor):
+    if not _table_exists(cursor, 'search_trigrams'):
+        build_trigram_index(cursor)
+
+def _code_usage(cursor):
+    if not _table_exists(cursor, 'code_usage'):
+        build_code_usage_table(cursor)
+
+# (version, name, migration). Append only: never renumber or edit a migration
+# that has shipped. Each one checks what is already there before doing work,
+# so databases built before this table existed only get what they lack.
+MIGRATIONS = [
+    (1, 'achi_search table', _achi_search),
+    (2, 'full-text indexes', _fts_indexes),
+    (3, 'trigram index', _trigram_index),
+    (4, 'code_usage table', _code_usage),
+    (5, 'icd10am_codes.category_id', build_icd_category_column),
+    (6, 'valid_relationships indexes', build_relationship_indexes),
+    (7, 'validation_result_cache table', build_validation_result_cache),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def _create_version_table(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    """)
+
+def applied_versions(conn: sqlite3.Connection) -> Dict[int, str]:
+    """version -> applied_at for every migration recorded in the database"""
+    if not _table_exists(conn, 'schema_version'):
+        return {}
+    return {version: applied_at for version, applied_at in conn.execute(
+        "SELECT version, applied_at FROM schema_version ORDER BY version"
+    )}
+
+def pending_migrations(conn: sqlite3.Connection) -> List[tuple]:
+    """Migrations not yet recorded, in order"""
+    applied = applied_versions(conn)
+    return [migration for migration in MIGRATIONS if migration[0] not in applied]
+
+def apply_migrations(conn: sqlite3.Connection) -> List[str]:
+    """
+    Apply pending migrations in order, each in its own transaction
+    Safe while the API is serving: readers keep going, and BEGIN IMMEDIATE
+    makes a second migrator wait and then skip what the first one applied.
+    Commits any open transaction on conn first. Returns the names applied.
+    """
+    conn.commit()
+    # Wait out another migrator (or an index build) instead of failing after 5s
+    conn.execute("PRAGMA busy_timeout = 300000")
+    if not pending_migrations(conn):
+        return []
+    _create_version_table(conn)
+    conn.commit()
+
+    applied = []
+    for version, name, migrate in MIGRATIONS:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if version in applied_versions(conn):
+                conn.rollback()
+                continue
+            migrate(conn.cursor())
+            conn.execute(
+                "INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+                (version, name, datetime.now().isoformat(timespec='seconds'))
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"+ Applied migration {version}: {name}")
+        applied.append(name)
+    return applied
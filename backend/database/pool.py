@@ -0,0 +1,134 @@
+"""
+Connection Pool
+Fixed-size pool of SQLite connections shared by request threads
+"""
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+class ConnectionPool:
+    """
+    Checked-out SQLite connections, one per concurrent request
+
+    Connections are opened lazily up to `size`; when all are checked out a
+    request waits (up to `timeout` seconds, first come first served) for one
+    to be returned. A thread that already holds a connection reuses it, so
+    nested DatabaseManager calls never wait on themselves.
+    """
+    def __init__(self, open_connection: Callable[[], sqlite3.Connection], size: int = 4, timeout: float = 30.0):
+        self.open_connection = open_connection
+        self.size = size
+        self.timeout = timeout
+        self.idle = []
+        self.waiters = deque()
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.closed = False
+        self.opened = 0
+        self.in_use = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of the with block"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+
+        conn = self._acquire()
+        self.local.conn = conn
+        try:
+            yield conn
+        finally:
+            self.local.conn = None
+            if conn.in_transaction:
+                conn.rollback()
+            self._release(conn)
+
+    def _acquire(self) -> sqlite3.Connection:
+        start = time.perf_counter()
+        waiter = None
+        open_new = False
+        with self.lock:
+            if self.idle:
+                conn = self.idle.pop()
+            elif self.opened < self.size:
+                self.opened += 1
+                open_new = True
+            else:
+                waiter = {'ready': threading.Event(), 'conn': None}
+                self.waiters.append(waiter)
+
+        if open_new:
+            try:
+                conn = self.open_connection()
+            except Exception:
+                with self.lock:
+                    self.opened -= 1
+                raise
+        elif waiter:
+            waiter['ready'].wait(self.timeout)
+            with self.lock:
+                if waiter['conn'] is None:
+                    self.waiters.remove(waiter)
+                    self.timeouts += 1
+                    raise TimeoutError(f"No database connection free after {self.timeout}s (pool size {self.size})")
+            conn = waiter['conn']
+
+        waited = time.perf_counter() - start
+        with self.lock:
+            self.in_use += 1
+            self.checkouts += 1
+            if waiter:
+                self.waits += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        return conn
+
+    def _release(self, conn: sqlite3.Connection):
+        # Hand the connection straight to the longest waiting thread (FIFO),
+        # so a busy thread can't grab it back before a waiter wakes up
+        with self.lock:
+            self.in_use -= 1
+            if self.closed:
+                self.opened -= 1
+            elif self.waiters:
+                waiter = self.waiters.popleft()
+                waiter['conn'] = conn
+                waiter['ready'].set()
+                return
+            else:
+                self.idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        """Close idle connections; checked-out ones are closed when returned"""
+        with self.lock:
+            self.closed = True
+            idle, self.idle = self.idle, []
+            self.opened -= len(idle)
+        for conn in idle:
+            conn.close()
+
+    def stats(self) -> Dict:
+        """Pool size, usage and checkout wait times (ms)"""
+        with self.lock:
+            return {
+                'size': self.size,
+                'open': self.opened,
+                'in_use': self.in_use,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'max_wait_ms': round(self.max_wait * 1000, 3)
+            }
@@ -0,0 +1,65 @@
+"""
+Code Popularity
+Usage counts from validation traffic, blended into autocomplete ranking
+"""
+import hashlib
+import math
+from typing import Dict, List
+
+# Places a result moves up per e-fold of validations (log-scaled, so a
+# handful of uses reorders near-ties and heavy use can't bury relevance)
+POPULARITY_WEIGHT = 4.0
+
+class CodePopularity:
+    """
+    In-memory snapshot of the most validated codes
+
+    Taken from code_usage at startup; ranking stays stable between restarts
+    (and the snapshot version feeds the search ETags).
+    """
+    def __init__(self, counts: Dict[str, Dict[str, int]]):
+        self.counts = counts
+        fingerprint = repr(sorted(
+            (code_type, code, uses)
+            for code_type, codes in counts.items()
+            for code, uses in codes.items()
+        ))
+        self.version = hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()[:8]
+
+    @classmethod
+    def load(cls, conn, limit: int = 5000):
+        """Top `limit` codes of each type (icd / achi) by number of validations"""
+        counts = {}
+        for code_type in ('icd', 'achi'):
+            cursor = conn.execute("""
+                SELECT code, uses FROM code_usage
+                WHERE code_type = ?
+                ORDER BY uses DESC, code
+                LIMIT ?
+            """, (code_type, limit))
+            counts[code_type] = {code: uses for code, uses in cursor.fetchall()}
+        return cls(counts)
+
+    def __len__(self):
+        return sum(len(codes) for codes in self.counts.values())
+
+    def uses(self, code_type: str) -> Dict[str, int]:
+        """code -> validations for one code type"""
+        return self.counts.get(code_type, {})
+
+    def rank(self, code_type: str, rows: List[Dict]) -> List[Dict]:
+        """
+        Blend popularity into a relevance-ordered result list
+        Each row keeps its position minus POPULARITY_WEIGHT * ln(1 + uses);
+        rows without usage keep their relative order.
+        """
+        uses = self.counts.get(code_type)
+        if not uses or not any(row['code'].upper() in uses for row in rows):
+            return rows
+
+        scored = [
+            (position - POPULARITY_WEIGHT * math.log1p(uses.get(row['code'].upper(), 0)), position, row)
+            for position, row in enumerate(rows)
+        ]
+        scored.sort(key=lambda item: item[:2])
+        return [row for _, _, row in scored]
@@ -0,0 +1,67 @@
+"""
+Database Connection Profiles
+How request-time connections open the reference database (DATABASE_PROFILE)
+"""
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict
+
+# Pragmas for connections that only read: memory-map the file instead of
+# copying pages through read(), keep a large page cache per connection and
+# build sorts/temp b-trees in memory
+READ_PRAGMAS = {
+    'mmap_size': int(os.getenv('DB_MMAP_SIZE', 256 * 1024 * 1024)),
+    'cache_size': -64 * 1024,  # KiB (64 MiB)
+    'temp_store': 'MEMORY',
+}
+
+# default:        read/write connections with SQLite defaults
+# read_optimized: read-only connections with READ_PRAGMAS; writes (usage
+#                 counts, confirmed relationships) go through one writer
+# immutable:      like read_optimized but SQLite skips locking and change
+#                 detection entirely; only for a database nothing writes to
+#                 while the API runs, so the API's own writes are disabled
+DATABASE_PROFILES = {
+    'default': {'uri_params': None, 'pragmas': {}, 'writes': True},
+    'read_optimized': {'uri_params': 'mode=ro', 'pragmas': READ_PRAGMAS, 'writes': True},
+    'immutable': {'uri_params': 'immutable=1', 'pragmas': READ_PRAGMAS, 'writes': False},
+}
+
+def get_profile(name: str) -> Dict:
+    """Look up a profile by name (ValueError for unknown names)"""
+    if name not in DATABASE_PROFILES:
+        raise ValueError(f"Unknown DATABASE_PROFILE '{name}' (expected one of: {', '.join(DATABASE_PROFILES)})")
+    return DATABASE_PROFILES[name]
+
+def open_connection(db_path: str, profile: Dict, read_only: bool = True) -> sqlite3.Connection:
+    """
+    Open a connection to db_path with the profile's mode and pragmas
+    read_only=False opens a plain read/write connection (the writer)
+    """
+    if read_only and profile['uri_params']:
+        uri = f"{Path(db_path).resolve().as_uri()}?{profile['uri_params']}"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+
+    if read_only:
+        for pragma, value in profile['pragmas'].items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+    return conn
+
+def warm_page_cache(db_path: str, limit: int = READ_PRAGMAS['mmap_size']) -> int:
+    """
+    Read the database file once so the first lookups after startup are
+    served from the OS page cache (and the mmap) instead of disk
+    Returns the number of bytes read
+    """
+    total = 0
+    with open(db_path, 'rb') as f:
+        while total < limit:
+            chunk = f.read(1024 * 1024)
+            if not chunk:
+                break
+            total += len(chunk)
+    return total
@@ -3,14 +3,337 @@ Database Query Functions
 Handles all database interactions for the validation system
 """
 import sqlite3
+import base64
+import json
 import os
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+
+from database.migrations import apply_migrations
+from database.pool import ConnectionPool
+from database.profiles import get_profile, open_connection, warm_page_cache
+from database.reference_store import ReferenceStore
+from database.popularity import CodePopularity
+from database.schema import (
+    ACHI_SEARCH_SELECT, ICD_CATEGORY_JOIN, LEGACY_ICD_CATEGORY_JOIN, build_code_usage_table,
+    compute_dataset_version, has_icd_category_column, icd_category_resolver
+)
+from database.search_cache import SearchCache, normalize_search_query
+from database.synonyms import SynonymExpander
+from database.trigram_index import TrigramIndex, tokenize_words
+
+# bm25() column weights (code, description): a code hit outranks a description hit
+FTS_RANK_WEIGHTS = (10.0, 1.0)
+
+# Fuzzy search re-ranks this many FTS candidates per requested result
+FUZZY_CANDIDATE_FACTOR = 5
+
+# Search cache kind -> code_usage.code_type
+SEARCH_USAGE_TYPES = {'icd': 'icd', 'achi_v2': 'achi'}
+
+# Codes per IN (...) query in bulk lookups, under SQLite's 999 bound parameter
+# limit on older builds
+BULK_LOOKUP_CHUNK = 500
+
+ICD_FTS_SEARCH_SQL = """
+    SELECT i.code, i.description
+    FROM icd10am_codes_fts
+    JOIN icd10am_codes i ON i.id = icd10am_codes_fts.rowid
+    WHERE icd10am_codes_fts MATCH ?
+    ORDER BY bm25(icd10am_codes_fts, ?, ?), i.code
+    LIMIT ?
+"""
+
+ACHI_V2_FTS_SEARCH_SQL = """
+    SELECT s.code, s.description, s.category
+    FROM achi_codes_v2_fts
+    JOIN achi_search s ON s.id = achi_codes_v2_fts.rowid
+    WHERE achi_codes_v2_fts MATCH ?
+    ORDER BY bm25(achi_codes_v2_fts, ?, ?), s.code
+    LIMIT ?
+"""
+
+def _build_fts_query(query_str: str, expander: Optional[SynonymExpander] = None) -> Optional[str]:
+    """
+    Turn raw autocomplete input into an FTS5 MATCH expression
+    Each whitespace-separated term becomes a prefix phrase ("G45.9" -> "g45 9"*),
+    terms are AND-ed. With an expander, abbreviations become an OR group of
+    the original term and its expansions ("tia" -> ("tia"* OR "transient ..."*)).
+    Returns None when the input has no searchable tokens.
+    """
+    terms = [tokens for tokens in (re.findall(r'[^\W_]+', term.lower()) for term in query_str.split()) if tokens]
+    if not terms:
+        return None
+    
+    groups = expander.expand(terms) if expander else [[tokens] for tokens in terms]
+    
+    parts = []
+    for alternatives in groups:
+        phrases = ['"' + ' '.join(tokens) + '"*' for tokens in alternatives]
+        parts.append(phrases[0] if len(phrases) == 1 else '(' + ' OR '.join(phrases) + ')')
+    
+    return ' AND '.join(parts)
+
+# Keyset-paginated search: (kind, path) -> query ordered by code, resuming after :after.
+# The 'code' plans are indexed range scans (code >= :low AND code < :high), used
+# for code-shaped queries when the in-memory prefix index isn't loaded.
+PAGE_SEARCH_SQL = {
+    ('icd', 'code'): """
+        SELECT code, description FROM icd10am_codes
+        WHERE code >= :low AND code < :high AND code > :after
+        ORDER BY code
+        LIMIT :limit
+    """,
+    ('icd', 'fts'): """
+        SELECT code, description FROM icd10am_codes
+        WHERE id IN (SELECT rowid FROM icd10am_codes_fts WHERE icd10am_codes_fts MATCH :match)
+          AND code > :after
+        ORDER BY code
+        LIMIT :limit
+    """,
+    ('icd', 'like'): """
+        SELECT code, description FROM icd10am_codes
+        WHERE code > :after
+          AND (code LIKE :pattern OR description LIKE :pattern)
+        ORDER BY code
+        LIMIT :limit
+    """,
+    ('achi', 'code'): """
+        SELECT 
+            a.code,
+            a.short_description as description,
+            b.block_short_desc as category
+        FROM achi_codes a
+        LEFT JOIN code_blocks b ON a.block_id = b.block_id
+        WHERE a.code >= :low AND a.code < :high AND a.code > :after
+        ORDER BY a.code
+        LIMIT :limit
+    """,
+    ('achi', 'like'): """
+        SELECT 
+            a.code,
+            a.short_description as description,
+            b.block_short_desc as category
+        FROM achi_codes a
+        LEFT JOIN code_blocks b ON a.block_id = b.block_id
+        WHERE a.code > :after
+          AND (a.code LIKE :pattern
+               OR a.description LIKE :pattern
+               OR a.short_description LIKE :pattern)
+        ORDER BY a.code
+        LIMIT :limit
+    """,
+    ('achi_v2', 'code'): """
+        SELECT code, description, category FROM achi_search
+        WHERE code >= :low AND code < :high AND code > :after
+        ORDER BY code
+        LIMIT :limit
+    """,
+    ('achi_v2', 'fts'): """
+        SELECT code, description, category FROM achi_search
+        WHERE id IN (SELECT rowid FROM achi_codes_v2_fts WHERE achi_codes_v2_fts MATCH :match)
+          AND code > :after
+        ORDER BY code
+        LIMIT :limit
+    """,
+    ('achi_v2', 'like'): """
+        SELECT code, description, category FROM achi_search
+        WHERE code > :after
+          AND (code LIKE :pattern OR description LIKE :pattern)
+        ORDER BY code
+        LIMIT :limit
+    """,
+}
+
+def _chunks(items: List, size: int):
+    """Consecutive slices of at most size items"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _encode_cursor(kind: str, query_key: str, path: str, last_code: str) -> str:
+    """Opaque page cursor: the search it belongs to and the last code returned"""
+    payload = json.dumps({'k': kind, 'q': query_key, 'p': path, 'c': last_code}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def _decode_cursor(cursor: str, kind: str, query_key: str) -> Tuple[str, str]:
+    """
+    Unpack a page cursor into (search path, last code)
+    Raises ValueError if it is malformed or was issued for another search
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        cursor_kind, cursor_query, path, last_code = payload['k'], payload['q'], payload['p'], payload['c']
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+    
+    if cursor_kind != kind or cursor_query != query_key:
+        raise ValueError("Cursor does not belong to this search")
+    if not isinstance(path, str) or not isinstance(last_code, str) \
+            or (path != 'code' and (kind, path) not in PAGE_SEARCH_SQL):
+        raise ValueError("Invalid cursor")
+    return path, last_code
+
+def _like_matches(query_key: str, row: Dict) -> bool:
+    """Python mirror of the LIKE '%q%' fallback"""
+    return query_key in row['code'].lower() or query_key in (row['description'] or '').lower()
+
+def _code_prefix_matches(query_key: str, row: Dict) -> bool:
+    """Python mirror of CodePrefixIndex.prefix_search"""
+    return row['code'].upper().startswith(query_key.upper())
+
+# Search path -> match rule, for narrowing cached candidates. Only paths ordered
+# by code: a filtered subset keeps the right order. FTS results are in BM25
+# order, which changes with the query, so 'fts' entries are exact hits only.
+SEARCH_MATCHERS = {
+    'code': _code_prefix_matches,
+    'like': _like_matches,
+}
+
+def _rank_by_similarity(rows: List[Dict], term_matches: List[List[Tuple[str, float]]], limit: int) -> List[Dict]:
+    """
+    Order fuzzy candidates by trigram similarity of the words they contain
+    Each query term scores the best-matching correction found in the description;
+    ties keep the FTS (BM25) order.
+    """
+    scored = []
+    for position, row in enumerate(rows):
+        words = set(tokenize_words(row['description']))
+        score = sum(
+            max((similarity for word, similarity in matches if word in words), default=0.0)
+            for matches in term_matches
+        )
+        scored.append((-score, position, row))
+    
+    scored.sort(key=lambda item: item[:2])
+    return [row for _, _, row in scored[:limit]]
+
+# Input that can only be the start of a code: "G", "G45", "G45.9" / "3900", "39006-0"
+ICD_CODE_PATTERN = re.compile(r'^[A-Z](?:\d[\dA-Z]*(?:\.[\dA-Z]*)?)?$')
+ACHI_CODE_PATTERN = re.compile(r'^\d{1,5}(?:-\d{0,2})?$')
+
+# Text shorter than this would prefix-match most of the vocabulary
+MIN_TEXT_QUERY_LENGTH = 2
+
+# Search kind -> query class answered by a code prefix plan
+CODE_QUERY_CLASSES = {'icd': 'icd_code', 'achi': 'achi_code', 'achi_v2': 'achi_code'}
+
+def classify_query(query_str: str) -> str:
+    """Query class of autocomplete input: 'icd_code', 'achi_code' or 'text'"""
+    key = query_str.strip().upper()
+    if ICD_CODE_PATTERN.match(key):
+        return 'icd_code'
+    if ACHI_CODE_PATTERN.match(key):
+        return 'achi_code'
+    return 'text'
+
+class QueryRouter:
+    """
+    Picks the cheapest plan for an autocomplete query and keeps per-class stats
+
+    Plans: 'code' (prefix index, or an indexed code range without one) for
+    queries shaped like a code of the searched vocabulary, 'fts' for text,
+    'like' for databases without FTS, and 'rejected' for one-character text.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = defaultdict(int)
+        self.plans = defaultdict(lambda: defaultdict(int))
+        self.total_seconds = defaultdict(float)
+        self.max_seconds = defaultdict(float)
+    
+    def route(self, kind: str, query_key: str, fts_available: bool) -> Tuple[str, str]:
+        """Return (query class, plan) for a normalized query"""
+        query_class = classify_query(query_key)
+        if query_class == CODE_QUERY_CLASSES[kind]:
+            return query_class, 'code'
+        if len(query_key.strip()) < MIN_TEXT_QUERY_LENGTH:
+            return query_class, 'rejected'
+        if fts_available and _build_fts_query(query_key):
+            return query_class, 'fts'
+        return query_class, 'like'
+    
+    def record(self, query_class: str, plan: str, seconds: float):
+        """Count one routed query and its latency"""
+        with self.lock:
+            self.counts[query_class] += 1
+            self.plans[query_class][plan] += 1
+            self.total_seconds[query_class] += seconds
+            self.max_seconds[query_class] = max(self.max_seconds[query_class], seconds)
+    
+    def stats(self) -> Dict:
+        """Counts, plans and latency (ms) per query class"""
+        with self.lock:
+            return {
+                query_class: {
+                    'count': count,
+                    'plans': dict(self.plans[query_class]),
+                    'avg_ms': round(self.total_seconds[query_class] / count * 1000, 3),
+                    'max_ms': round(self.max_seconds[query_class] * 1000, 3)
+                }
+                for query_class, count in self.counts.items()
+            }
+
+class CodePrefixIndex:
+    """
+    Sorted in-memory array of codes for prefix lookups
+    Row dicts are kept next to a parallel list of upper-cased codes,
+    so a prefix query is two bisects over at most `limit` entries.
+    """
+    def __init__(self, rows: List[Dict]):
+        self.rows = sorted(rows, key=lambda row: row['code'].upper())
+        self.keys = [row['code'].upper() for row in self.rows]
+        self.popular_positions = []
+        self.popular_uses = {}
+    
+    def __len__(self):
+        return len(self.keys)
+    
+    def set_popularity(self, uses: Dict[str, int]):
+        """Mark frequently validated codes so prefix_search can surface them first"""
+        self.popular_uses = uses
+        self.popular_positions = [i for i, key in enumerate(self.keys) if key in uses]
+    
+    def prefix_search(self, prefix: str, limit: int = 20, after: str = None,
+                      popular_first: bool = False) -> List[Dict]:
+        """
+        Return up to `limit` rows whose code starts with prefix, in code order
+        after: resume after this code (keyset pagination)
+        popular_first: popular codes anywhere in the prefix range come first
+        """
+        prefix = prefix.strip().upper()
+        start = bisect_left(self.keys, prefix)
+        if after:
+            start = max(start, bisect_right(self.keys, after.upper()))
+        end = bisect_left(self.keys, prefix + '\uffff', start, min(start + limit, len(self.keys)))
+        positions = range(start, end)
+        
+        if popular_first and self.popular_positions:
+            # Popular codes past the first `limit` rows of a short prefix ("G")
+            # would otherwise never be candidates
+            range_end = bisect_left(self.keys, prefix + '\uffff', start)
+            popular = self.popular_positions[
+                bisect_left(self.popular_positions, start):bisect_left(self.popular_positions, range_end)
+            ]
+            popular.sort(key=lambda i: -self.popular_uses[self.keys[i]])
+            popular = popular[:limit]
+            seen = set(popular)
+            positions = popular + [i for i in positions if i not in seen][:limit - len(popular)]
+        
+        # Copies, so callers can't mutate the index
+        return [self.rows[i].copy() for i in positions]
 
 class DatabaseManager:
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, profile: str = None):
         """
         Initialize database connection
+        profile: connection profile (see database/profiles.py), default DATABASE_PROFILE
         """
         if db_path is None:
             # Try both paths (running from backend/ or from root)
@@ -26,280 +349,794 @@ class DatabaseManager:
                 db_path = str(db_path1)  # Use default path for error message
         
         self.db_path = db_path
+        self.profile_name = profile or os.getenv('DATABASE_PROFILE', 'default')
+        self.profile = None
         self.conn = None
+        self.pool = None
+        self.write_lock = threading.Lock()
+        self.tables = set()
+        self.icd_category_join = LEGACY_ICD_CATEGORY_JOIN
+        self.icd_code_index = None
+        self.achi_code_index = None
+        self.trigram_index = None
+        self.reference_store = None
+        self.synonym_expander = None
+        self.dataset_version = None
+        self.popularity = None
+        self.router = QueryRouter()
+        self.search_cache = SearchCache(max_entries=int(os.getenv('SEARCH_CACHE_SIZE', 2048)))
     
     def connect(self):
-        """Establish database connection"""
+        """
+        Establish database connections
+        self.conn serves startup loading and scripts; request-time queries
+        check connections out of self.pool (DB_POOL_SIZE, default 4)
+        """
         if not Path(self.db_path).exists():
             raise FileNotFoundError(f"Database not found at {self.db_path}. Run database_setup.py first.")
         
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
+        self.profile = get_profile(self.profile_name)
+        # Read/write unless the profile forbids writes; it is the writer for read-only profiles
+        self.conn = open_connection(self.db_path, self.profile, read_only=not self.profile['writes'])
+        
+        # Remember which optional tables (search indexes) this database was built with
+        cursor = self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        self.tables = {row['name'] for row in cursor.fetchall()}
+        self._prepare_connection(self.conn)
+        # Resolved category column if the build stored one, else the prefix join
+        if has_icd_category_column(self.conn):
+            self.icd_category_join = ICD_CATEGORY_JOIN
+        else:
+            self.icd_category_join = LEGACY_ICD_CATEGORY_JOIN
+        
+        self.dataset_version = self._load_dataset_version()
+        
+        if self.pool:
+            self.pool.close()
+        self.pool = ConnectionPool(self._open_connection, size=int(os.getenv('DB_POOL_SIZE', 4)))
     
-    def close(self):
-        """Close database connection"""
-        if self.conn:
-            self.conn.close()
+    def _prepare_connection(self, conn: sqlite3.Connection):
+        """Per-connection setup every query relies on"""
+        if 'achi_search' not in self.tables and 'achi_codes_v2' in self.tables:
+            # Built before achi_search existed: same columns through a per-connection view
+            conn.execute(f"CREATE TEMP VIEW achi_search AS {ACHI_SEARCH_SELECT}")
     
-    def get_icd_with_category(self, icd_code: str) -> Optional[Dict]:
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open a pooled connection (read-only under the read-optimized profiles)"""
+        conn = open_connection(self.db_path, self.profile)
+        self._prepare_connection(conn)
+        return conn
+    
+    @contextmanager
+    def _connection(self):
+        """Check a connection out of the pool for the duration of a with block"""
+        if not self.pool:
+            self.connect()
+        with self.pool.connection() as conn:
+            yield conn
+    
+    @property
+    def writes_enabled(self) -> bool:
+        """Whether the connection profile allows the API's own writes"""
+        if not self.conn:
+            self.connect()
+        return self.profile['writes']
+    
+    @contextmanager
+    def _write_connection(self):
         """
-        Get ICD code with its category from database
+        Connection for the API's own writes (usage counts, confirmed relationships)
+        Read-only profiles write through self.conn, one writer at a time
         """
         if not self.conn:
             self.connect()
-        
-        cursor = self.conn.execute("""
-            SELECT 
-                i.code,
-                i.description,
-                c.description as category
-            FROM icd10am_codes i
-            LEFT JOIN icd10_main_categories c 
-                ON c.code LIKE substr(i.code, 1, 3) || '%'
-            WHERE i.code = ?
-            LIMIT 1
-        """, (icd_code,))
-        
-        row = cursor.fetchone()
-        if row:
-            return {
-                'code': row['code'],
-                'description': row['description'],
-                'category': row['category'] or 'Unknown'
-            }
-        return None
+        if not self.profile['uri_params']:
+            with self._connection() as conn:
+                yield conn
+            return
+        with self.write_lock:
+            yield self.conn
     
-    def get_achi_with_category(self, achi_code: str) -> Optional[Dict]:
+    def warm_page_cache(self) -> int:
         """
-        Get ACHI code with its block category
+        Pre-read the database file for the read-optimized profiles
+        Returns bytes read (0 under the default profile)
+        """
+        if not self.conn:
+            self.connect()
+        if not self.profile['pragmas']:
+            return 0
+        return warm_page_cache(self.db_path)
+    
+    def _load_dataset_version(self) -> str:
+        """
+        Dataset version stamped at build time
+        Databases built before dataset_metadata existed are hashed on connect
+        """
+        if 'dataset_metadata' in self.tables:
+            row = self.conn.execute(
+                "SELECT value FROM dataset_metadata WHERE key = 'dataset_version'"
+            ).fetchone()
+            if row:
+                return row['value']
+        return compute_dataset_version(self.conn.cursor())
+    
+    @property
+    def search_version(self) -> str:
+        """
+        Version of everything that shapes search results: the reference data
+        plus the synonym dictionary. Used to derive HTTP ETags.
+        """
+        if not self.conn:
+            self.connect()
+        synonyms_version = self.synonym_expander.version if self.synonym_expander else 'none'
+        ranking_version = self.popularity.version if self.popularity else 'none'
+        return f"{self.dataset_version}-{synonyms_version}-{ranking_version}"
+    
+    def load_code_indexes(self):
+        """
+        Load ICD and ACHI v2 codes into sorted in-memory prefix indexes
+        Called once at startup; code-prefix autocomplete then skips SQLite
         """
         if not self.conn:
             self.connect()
         
-        cursor = self.conn.execute("""
-            SELECT 
-                a.code,
-                a.description,
-                a.short_description,
-                b.block_short_desc as category,
-                b.block_description
-            FROM achi_codes a
-            LEFT JOIN code_blocks b ON a.block_id = b.block_id
-            WHERE a.code = ?
-            LIMIT 1
-        """, (achi_code,))
-        
-        row = cursor.fetchone()
-        if row:
-            return {
-                'code': row['code'],
-                'description': row['description'],
-                'short_description': row['short_description'],
-                'category': row['category'] or 'Unknown',
-                'block_description': row['block_description']
-            }
-        return None
+        cursor = self.conn.execute("SELECT code, description FROM icd10am_codes")
+        self.icd_code_index = CodePrefixIndex([dict(row) for row in cursor.fetchall()])
+        
+        cursor = self.conn.execute("SELECT code, description, category FROM achi_search")
+        self.achi_code_index = CodePrefixIndex([dict(row) for row in cursor.fetchall()])
+        
+        return len(self.icd_code_index), len(self.achi_code_index)
     
-    def get_exact_match(self, icd_code: str, achi_code: str) -> Optional[Dict]:
+    def load_reference_store(self) -> Dict[str, int]:
         """
-        Check if exact relationship exists in database
+        Load ICD / ACHI reference records into memory for O(1) code lookups
+        get_icd_with_category, get_achi_with_category and get_achi_with_hierarchy
+        then skip SQLite; returns records per table
         """
         if not self.conn:
             self.connect()
         
-        cursor = self.conn.execute("""
-            SELECT * FROM valid_relationships
-            WHERE icd_code = ? AND achi_code = ?
-        """, (icd_code, achi_code))
+        self.reference_store = ReferenceStore.load(self.conn)
+        return self.reference_store.counts()
+    
+    def load_trigram_index(self) -> int:
+        """
+        Load the trigram index for fuzzy description search
+        Returns the vocabulary size (0 if the database was built without one)
+        """
+        if not self._has_table('search_trigrams'):
+            self.trigram_index = None
+            return 0
+        
+        self.trigram_index = TrigramIndex.load(self.conn)
+        return len(self.trigram_index)
+    
+    def load_synonyms(self, path: str = None) -> int:
+        """
+        Compile the clinical abbreviation/synonym dictionary used by text search
+        Defaults to data/clinical_synonyms.json; returns the number of keys
+        """
+        self.synonym_expander = SynonymExpander.load(path)
+        self.search_cache.clear()
+        return len(self.synonym_expander)
+    
+    def load_popularity(self, limit: int = 5000) -> int:
+        """
+        Snapshot the most validated codes for ranking (creating and seeding
+        code_usage on databases built before it existed)
+        Returns the number of codes in the snapshot
+        """
+        if not self._has_table('code_usage'):
+            if not self.writes_enabled:
+                self.popularity = None
+                return 0
+            build_code_usage_table(self.conn.cursor())
+            self.conn.commit()
+            self.tables.add('code_usage')
+        
+        self.popularity = CodePopularity.load(self.conn, limit)
+        for code_index, code_type in ((self.icd_code_index, 'icd'), (self.achi_code_index, 'achi')):
+            if code_index:
+                code_index.set_popularity(self.popularity.uses(code_type))
+        return len(self.popularity)
+    
+    def apply_migrations(self) -> List[str]:
+        """
+        Bring the database schema up to date in place (see database.migrations)
+        No-op when writes are disabled. Returns the migrations applied.
+        """
+        if not self.writes_enabled:
+            return []
+        
+        # A plain connection: the API's own ones may carry the temporary achi_search view
+        with self.write_lock:
+            conn = open_connection(self.db_path, self.profile, read_only=False)
+            try:
+                applied = apply_migrations(conn)
+            finally:
+                conn.close()
+        if applied:
+            # Reopen so table detection, the category join and pooled connections see the new schema
+            self.close()
+            self.connect()
+        return applied
+    
+    def record_code_usage(self, icd_code: str, achi_code: str):
+        """
+        Count one validation of an ICD/ACHI pair in code_usage
+        The ranking snapshot is refreshed by load_popularity (at startup)
+        """
+        if not self._has_table('code_usage') or not self.writes_enabled:
+            return
+        
+        with self._write_connection() as conn:
+            conn.executemany("""
+                INSERT INTO code_usage (code_type, code, uses, last_used)
+                VALUES (?, ?, 1, CURRENT_TIMESTAMP)
+                ON CONFLICT (code_type, code) DO UPDATE SET
+                    uses = uses + 1,
+                    last_used = excluded.last_used
+            """, [('icd', icd_code.strip().upper()), ('achi', achi_code.strip().upper())])
+            conn.commit()
+    
+    def get_cached_validation(self, icd_code: str, achi_code: str, model: str,
+                              prompt_version: str) -> Optional[Tuple[Dict, Optional[float]]]:
+        """
+        Stored validation result for a pair under this model and prompt version
+        Returns (result dict, expires_at epoch seconds or None), or None when
+        missing or expired
+        """
+        if not self._has_table('validation_result_cache'):
+            return None
         
-        row = cursor.fetchone()
-        if row:
-            return dict(row)
-        return None
+        with self._connection() as conn:
+            row = conn.execute("""
+                SELECT result, expires_at FROM validation_result_cache
+                WHERE icd_code = ? AND achi_code = ? AND model = ? AND prompt_version = ?
+                  AND (expires_at IS NULL OR expires_at > ?)
+            """, (icd_code, achi_code, model, prompt_version, time.time())).fetchone()
+        
+        return (json.loads(row['result']), row['expires_at']) if row else None
     
-    def get_similar_examples(self, icd_category: str, achi_category: str, limit: int = 5) -> List[Dict]:
+    def store_cached_validation(self, icd_code: str, achi_code: str, model: str, prompt_version: str,
+                                result: Dict, ttl: Optional[int] = None) -> bool:
         """
-        Get similar validated examples from same categories
+        Store (or replace) a validation result for other workers and later restarts
+        ttl: seconds until it expires, None to keep it until replaced
+        """
+        if not self._has_table('validation_result_cache') or not self.writes_enabled:
+            return False
+        
+        now = time.time()
+        with self._write_connection() as conn:
+            conn.execute("""
+                INSERT INTO validation_result_cache
+                (icd_code, achi_code, model, prompt_version, source, result, created_at, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (icd_code, achi_code, model, prompt_version) DO UPDATE SET
+                    source = excluded.source,
+                    result = excluded.result,
+                    created_at = excluded.created_at,
+                    expires_at = excluded.expires_at
+            """, (
+                icd_code, achi_code, model, prompt_version, result.get('source', ''),
+                json.dumps(result), now, None if ttl is None else now + ttl
+            ))
+            conn.commit()
+        return True
+    
+    def prune_validation_cache(self) -> int:
+        """Delete expired validation results; returns the number removed"""
+        if not self._has_table('validation_result_cache') or not self.writes_enabled:
+            return 0
+        
+        with self._write_connection() as conn:
+            cursor = conn.execute(
+                "DELETE FROM validation_result_cache WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (time.time(),)
+            )
+            conn.commit()
+            return cursor.rowcount
+    
+    def _fuzzy_search(self, search_sql: str, query_str: str, limit: int) -> List:
         """
+        Typo-tolerant description search
+        Each query term is replaced by its closest vocabulary words (trigram
+        similarity), the corrected terms are matched through the FTS index and
+        the candidates re-ranked by similarity. Needs both indexes loaded.
+        """
+        if not self.trigram_index or len(query_str.strip()) < MIN_TEXT_QUERY_LENGTH:
+            return []
+        
+        term_matches = []
+        for term in tokenize_words(query_str):
+            matches = self.trigram_index.similar_words(term)
+            if not matches:
+                return []
+            term_matches.append(matches)
+        
+        if not term_matches:
+            return []
+        
+        fts_query = ' AND '.join(
+            'description : (' + ' OR '.join(f'"{word}"' for word, _ in matches) + ')'
+            for matches in term_matches
+        )
+        with self._connection() as conn:
+            candidates = conn.execute(
+                search_sql,
+                (fts_query, *FTS_RANK_WEIGHTS, limit * FUZZY_CANDIDATE_FACTOR)
+            ).fetchall()
+        
+        return _rank_by_similarity(candidates, term_matches, limit)
+    
+    def _has_table(self, table_name: str) -> bool:
+        """Check whether the connected database has a table"""
         if not self.conn:
             self.connect()
+        return table_name in self.tables
+    
+    def close(self):
+        """Close database connections"""
+        if self.pool:
+            self.pool.close()
+        if self.conn:
+            self.conn.close()
+    
+    def get_icd_with_category(self, icd_code: str) -> Optional[Dict]:
+        """
+        Get ICD code with its category from database
+        """
+        if self.reference_store:
+            return self.reference_store.icd_with_category(icd_code)
         
-        cursor = self.conn.execute("""
-            SELECT * FROM valid_relationships
-            WHERE icd_category = ? AND achi_category = ?
-            ORDER BY confidence DESC
-            LIMIT ?
-        """, (icd_category, achi_category, limit))
+        with self._connection() as conn:
+            cursor = conn.execute(f"""
+                SELECT 
+                    i.code,
+                    i.description,
+                    c.description as category
+                FROM icd10am_codes i
+                LEFT JOIN icd10_main_categories c 
+                    ON {self.icd_category_join}
+                WHERE i.code = ?
+                LIMIT 1
+            """, (icd_code,))
+            
+            row = cursor.fetchone()
+            if row:
+                return {
+                    'code': row['code'],
+                    'description': row['description'],
+                    'category': row['category'] or 'Unknown'
+                }
+            return None
+    
+    def get_achi_with_category(self, achi_code: str) -> Optional[Dict]:
+        """
+        Get ACHI code with its block category
+        """
+        if self.reference_store:
+            return self.reference_store.achi_with_category(achi_code)
         
-        return [dict(row) for row in cursor.fetchall()]
+        with self._connection() as conn:
+            cursor = conn.execute("""
+                SELECT 
+                    a.code,
+                    a.description,
+                    a.short_description,
+                    b.block_short_desc as category,
+                    b.block_description
+                FROM achi_codes a
+                LEFT JOIN code_blocks b ON a.block_id = b.block_id
+                WHERE a.code = ?
+                LIMIT 1
+            """, (achi_code,))
+            
+            row = cursor.fetchone()
+            if row:
+                return {
+                    'code': row['code'],
+                    'description': row['description'],
+                    'short_description': row['short_description'],
+                    'category': row['category'] or 'Unknown',
+                    'block_description': row['block_description']
+                }
+            return None
+    
+    def get_exact_match(self, icd_code: str, achi_code: str) -> Optional[Dict]:
+        """
+        Check if exact relationship exists in database
+        """
+        with self._connection() as conn:
+            cursor = conn.execute("""
+                SELECT * FROM valid_relationships
+                WHERE icd_code = ? AND achi_code = ?
+            """, (icd_code, achi_code))
+            
+            row = cursor.fetchone()
+            if row:
+                return dict(row)
+            return None
+    
+    def get_similar_examples(self, icd_category: str, achi_category: str, limit: int = 5) -> List[Dict]:
+        """
+        Get similar validated examples from same categories
+        """
+        with self._connection() as conn:
+            cursor = conn.execute("""
+                SELECT * FROM valid_relationships
+                WHERE icd_category = ? AND achi_category = ?
+                ORDER BY confidence DESC
+                LIMIT ?
+            """, (icd_category, achi_category, limit))
+            
+            return [dict(row) for row in cursor.fetchall()]
     
     def get_achi_with_hierarchy(self, achi_code: str) -> Optional[Dict]:
         """
         Get ACHI code with full hierarchical information from v2 table
+        Single-row read from the denormalized achi_search table
         """
-        if not self.conn:
-            self.connect()
+        if self.reference_store:
+            return self.reference_store.achi_with_hierarchy(achi_code)
         
-        cursor = self.conn.execute("""
-            SELECT 
-                ac.code,
-                ac.description,
-                am.code as main_category_code,
-                am.name as main_category_name,
-                asc.name as sub_category_name,
-                asc.range_start,
-                asc.range_end
-            FROM achi_codes_v2 ac
-            LEFT JOIN achi_main_categories am ON ac.main_category_code = am.code
-            LEFT JOIN achi_sub_categories asc ON ac.sub_category_id = asc.id
-            WHERE ac.code = ?
-            LIMIT 1
-        """, (achi_code,))
-        
-        row = cursor.fetchone()
-        if row:
-            return {
-                'code': row['code'],
-                'description': row['description'],
-                'main_category_code': row['main_category_code'],
-                'main_category_name': row['main_category_name'],
-                'sub_category_name': row['sub_category_name'],
-                'sub_category_range': f"{row['range_start']}-{row['range_end']}" if row['range_start'] and row['range_end'] else None
-            }
-        return None
+        with self._connection() as conn:
+            cursor = conn.execute("""
+                SELECT 
+                    code,
+                    description,
+                    main_category_code,
+                    main_category_name,
+                    sub_category_name,
+                    sub_category_range
+                FROM achi_search
+                WHERE code = ?
+            """, (achi_code,))
+            
+            row = cursor.fetchone()
+            if row:
+                return dict(row)
+            return None
+    
+    def get_icd_codes_with_category(self, icd_codes: List[str]) -> Dict[str, Dict]:
+        """
+        Bulk get_icd_with_category: code -> record for every code that exists
+        One IN query per BULK_LOOKUP_CHUNK codes (dict reads with the reference store)
+        """
+        codes = list(dict.fromkeys(icd_codes))
+        if self.reference_store:
+            records = (self.reference_store.icd_with_category(code) for code in codes)
+            return {record['code']: record for record in records if record}
+        
+        found = {}
+        with self._connection() as conn:
+            if self.icd_category_join == ICD_CATEGORY_JOIN:
+                category_sql = "c.description"
+                category_join = f"LEFT JOIN icd10_main_categories c ON {ICD_CATEGORY_JOIN}"
+            else:
+                # The prefix LIKE join scans every category per code: resolve them here instead
+                category_sql, category_join = "NULL", ""
+                category_of = icd_category_resolver(conn.execute(
+                    "SELECT code, description FROM icd10_main_categories ORDER BY rowid"
+                ).fetchall())
+            
+            for chunk in _chunks(codes, BULK_LOOKUP_CHUNK):
+                cursor = conn.execute(f"""
+                    SELECT i.code, i.description, {category_sql} as category
+                    FROM icd10am_codes i
+                    {category_join}
+                    WHERE i.code IN ({', '.join('?' * len(chunk))})
+                """, chunk)
+                for row in cursor.fetchall():
+                    category = row['category'] if category_join else category_of(row['code'])
+                    found[row['code']] = {
+                        'code': row['code'],
+                        'description': row['description'],
+                        'category': category or 'Unknown'
+                    }
+        return found
+    
+    def get_achi_codes_with_hierarchy(self, achi_codes: List[str]) -> Dict[str, Dict]:
+        """
+        Bulk get_achi_with_hierarchy: code -> record for every code that exists
+        One IN query per BULK_LOOKUP_CHUNK codes (dict reads with the reference store)
+        """
+        codes = list(dict.fromkeys(achi_codes))
+        if self.reference_store:
+            records = (self.reference_store.achi_with_hierarchy(code) for code in codes)
+            return {record['code']: record for record in records if record}
+        
+        found = {}
+        with self._connection() as conn:
+            for chunk in _chunks(codes, BULK_LOOKUP_CHUNK):
+                cursor = conn.execute(f"""
+                    SELECT 
+                        code,
+                        description,
+                        main_category_code,
+                        main_category_name,
+                        sub_category_name,
+                        sub_category_range
+                    FROM achi_search
+                    WHERE code IN ({', '.join('?' * len(chunk))})
+                """, chunk)
+                for row in cursor.fetchall():
+                    found[row['code']] = dict(row)
+        return found
     
     def get_icd_chapter_info(self, icd_code: str) -> Optional[Dict]:
         """
         Get ICD chapter information for hierarchical context
         """
-        if not self.conn:
-            self.connect()
-        
         # Extract first character for chapter mapping
         first_char = icd_code[0].upper()
         
-        cursor = self.conn.execute("""
-            SELECT code, description FROM icd10_main_categories
-            WHERE code LIKE ? OR code = ?
-            ORDER BY LENGTH(code) DESC
-            LIMIT 1
-        """, (f'{first_char}%', first_char))
-        
-        row = cursor.fetchone()
-        if row:
-            return {
-                'chapter_code': row['code'],
-                'chapter_name': row['description']
-            }
-        return None
+        with self._connection() as conn:
+            cursor = conn.execute("""
+                SELECT code, description FROM icd10_main_categories
+                WHERE code LIKE ? OR code = ?
+                ORDER BY LENGTH(code) DESC
+                LIMIT 1
+            """, (f'{first_char}%', first_char))
+            
+            row = cursor.fetchone()
+            if row:
+                return {
+                    'chapter_code': row['code'],
+                    'chapter_name': row['description']
+                }
+            return None
     
     def get_category_mapping(self, icd_chapter: str, achi_main_code: str) -> Optional[Dict]:
         """
         Get ICD-ACHI category mapping information
         """
-        if not self.conn:
-            self.connect()
+        with self._connection() as conn:
+            cursor = conn.execute("""
+                SELECT 
+                    icd_chapter_name,
+                    achi_main_category_name,
+                    mapping_confidence,
+                    notes
+                FROM icd_achi_category_mapping
+                WHERE icd_chapter = ? AND achi_main_category_code = ?
+            """, (icd_chapter, achi_main_code))
+            
+            row = cursor.fetchone()
+            if row:
+                return {
+                    'icd_chapter_name': row['icd_chapter_name'],
+                    'achi_main_category_name': row['achi_main_category_name'],
+                    'mapping_confidence': row['mapping_confidence'],
+                    'notes': row['notes']
+                }
+            return None
+    
+    def _code_rows(self, kind: str, code_index: Optional[CodePrefixIndex], prefix: str, limit: int,
+                   after: str = '', popular_first: bool = False) -> List[Dict]:
+        """
+        Rows whose code starts with prefix, from the in-memory index when it is
+        loaded, otherwise through an indexed code range scan
+        """
+        if code_index:
+            return code_index.prefix_search(prefix, limit, after=after or None, popular_first=popular_first)
         
-        cursor = self.conn.execute("""
-            SELECT 
-                icd_chapter_name,
-                achi_main_category_name,
-                mapping_confidence,
-                notes
-            FROM icd_achi_category_mapping
-            WHERE icd_chapter = ? AND achi_main_category_code = ?
-        """, (icd_chapter, achi_main_code))
-        
-        row = cursor.fetchone()
-        if row:
-            return {
-                'icd_chapter_name': row['icd_chapter_name'],
-                'achi_main_category_name': row['achi_main_category_name'],
-                'mapping_confidence': row['mapping_confidence'],
-                'notes': row['notes']
-            }
-        return None
+        low = prefix.strip().upper()
+        with self._connection() as conn:
+            cursor = conn.execute(PAGE_SEARCH_SQL[(kind, 'code')], {
+                'low': low, 'high': low + '\uffff', 'after': after, 'limit': limit
+            })
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def _routed_search(self, kind: str, query_str: str, limit: int, fts_table: str, search_fn) -> List[Dict]:
+        """Route an autocomplete query, run it through the cache and record its latency"""
+        start = time.perf_counter()
+        query_key = normalize_search_query(query_str)
+        query_class, plan = self.router.route(kind, query_key, self._has_table(fts_table))
+        
+        results = [] if plan == 'rejected' else self._cached_search(kind, query_key, limit, plan, search_fn)
+        
+        self.router.record(query_class, plan, time.perf_counter() - start)
+        return results
     
-    def search_icd_codes(self, query_str: str, limit: int = 20) -> List[Dict]:
+    def _cached_search(self, kind: str, query_str: str, limit: int, path: str, search_fn) -> List[Dict]:
+        """
+        Run search_fn through the search cache
+        Misses fetch a full candidate page so later keystrokes can narrow it;
+        search_fn(query_key, limit) returns (rows, path actually used).
+        """
+        query_key = normalize_search_query(query_str)
+        if limit > self.search_cache.candidate_limit:
+            rows, _ = search_fn(query_key, limit)
+            return rows
+        
+        matcher = SEARCH_MATCHERS.get(path)
+        
+        rows = self.search_cache.lookup(kind, query_key, path, matcher)
+        if rows is None:
+            rows, used_path = search_fn(query_key, self.search_cache.candidate_limit)
+            self.search_cache.store(kind, query_key, used_path, rows)
+        
+        # Cached candidates stay in relevance order; popularity is blended per request
+        if self.popularity:
+            rows = self.popularity.rank(SEARCH_USAGE_TYPES[kind], rows)
+        
+        return [row.copy() for row in rows[:limit]]
+    
+    def search_icd_codes(self, query_str: str, limit: int = 20, fuzzy: bool = False) -> List[Dict]:
         """
         Search ICD codes for autocomplete
+        Uses the FTS5 index (BM25 ranked, prefix tokens) when the database has one;
+        fuzzy=True matches misspelled description terms via the trigram index
         """
         if not self.conn:
             self.connect()
         
-        query_pattern = f"%{query_str}%"
+        if fuzzy:
+            if not self._has_table('icd10am_codes_fts'):
+                return []
+            return [dict(row) for row in self._fuzzy_search(ICD_FTS_SEARCH_SQL, query_str, limit)]
         
-        cursor = self.conn.execute("""
-            SELECT code, description FROM icd10am_codes
-            WHERE code LIKE ? OR description LIKE ?
-            ORDER BY code
-            LIMIT ?
-        """, (query_pattern, query_pattern, limit))
+        return self._routed_search('icd', query_str, limit, 'icd10am_codes_fts', self._search_icd_uncached)
+    
+    def _search_icd_uncached(self, query_str: str, limit: int) -> Tuple[List[Dict], str]:
+        """ICD autocomplete query; returns (rows, search path used)"""
+        # Code prefixes ("G45", "J45.9") are answered from memory (or the code index)
+        if classify_query(query_str) == 'icd_code':
+            results = self._code_rows('icd', self.icd_code_index, query_str, limit, popular_first=True)
+            if results:
+                return results, 'code'
         
-        return [dict(row) for row in cursor.fetchall()]
+        with self._connection() as conn:
+            fts_query = _build_fts_query(query_str, self.synonym_expander)
+            if fts_query and self._has_table('icd10am_codes_fts'):
+                cursor = conn.execute(ICD_FTS_SEARCH_SQL, (fts_query, *FTS_RANK_WEIGHTS, limit))
+                return [dict(row) for row in cursor.fetchall()], 'fts'
+            
+            # Fallback: full LIKE scan (database built without FTS indexes)
+            query_pattern = f"%{query_str}%"
+            
+            cursor = conn.execute("""
+                SELECT code, description FROM icd10am_codes
+                WHERE code LIKE ? OR description LIKE ?
+                ORDER BY code
+                LIMIT ?
+            """, (query_pattern, query_pattern, limit))
+            
+            return [dict(row) for row in cursor.fetchall()], 'like'
     
     def search_achi_codes(self, query_str: str, limit: int = 20) -> List[Dict]:
         """
         Search ACHI codes for autocomplete
         """
+        with self._connection() as conn:
+            query_pattern = f"%{query_str}%"
+            
+            cursor = conn.execute("""
+                SELECT 
+                    a.code,
+                    a.short_description as description,
+                    b.block_short_desc as category
+                FROM achi_codes a
+                LEFT JOIN code_blocks b ON a.block_id = b.block_id
+                WHERE a.code LIKE ? 
+                   OR a.description LIKE ? 
+                   OR a.short_description LIKE ?
+                ORDER BY a.code
+                LIMIT ?
+            """, (query_pattern, query_pattern, query_pattern, limit))
+            
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def search_achi_codes_v2(self, query_str: str, limit: int = 20, fuzzy: bool = False) -> List[Dict]:
+        """
+        Search ACHI codes v2 with hierarchical context for autocomplete
+        Uses the FTS5 index (BM25 ranked, prefix tokens) when the database has one;
+        fuzzy=True matches misspelled description terms via the trigram index
+        """
         if not self.conn:
             self.connect()
         
-        query_pattern = f"%{query_str}%"
+        if fuzzy:
+            if not self._has_table('achi_codes_v2_fts'):
+                return []
+            return [dict(row) for row in self._fuzzy_search(ACHI_V2_FTS_SEARCH_SQL, query_str, limit)]
         
-        cursor = self.conn.execute("""
-            SELECT 
-                a.code,
-                a.short_description as description,
-                b.block_short_desc as category
-            FROM achi_codes a
-            LEFT JOIN code_blocks b ON a.block_id = b.block_id
-            WHERE a.code LIKE ? 
-               OR a.description LIKE ? 
-               OR a.short_description LIKE ?
-            ORDER BY a.code
-            LIMIT ?
-        """, (query_pattern, query_pattern, query_pattern, limit))
+        return self._routed_search('achi_v2', query_str, limit, 'achi_codes_v2_fts', self._search_achi_v2_uncached)
+    
+    def _search_achi_v2_uncached(self, query_str: str, limit: int) -> Tuple[List[Dict], str]:
+        """ACHI v2 autocomplete query; returns (rows, search path used)"""
+        # Code prefixes ("3900", "39006-0") are answered from memory (or the code index)
+        if classify_query(query_str) == 'achi_code':
+            results = self._code_rows('achi_v2', self.achi_code_index, query_str, limit, popular_first=True)
+            if results:
+                return results, 'code'
         
-        return [dict(row) for row in cursor.fetchall()]
+        with self._connection() as conn:
+            fts_query = _build_fts_query(query_str, self.synonym_expander)
+            if fts_query and self._has_table('achi_codes_v2_fts'):
+                cursor = conn.execute(ACHI_V2_FTS_SEARCH_SQL, (fts_query, *FTS_RANK_WEIGHTS, limit))
+                return [dict(row) for row in cursor.fetchall()], 'fts'
+            
+            # Fallback: full LIKE scan (database built without FTS indexes)
+            query_pattern = f"%{query_str}%"
+            
+            cursor = conn.execute("""
+                SELECT code, description, category FROM achi_search
+                WHERE code LIKE ? 
+                   OR description LIKE ?
+                ORDER BY code
+                LIMIT ?
+            """, (query_pattern, query_pattern, limit))
+            
+            return [dict(row) for row in cursor.fetchall()], 'like'
     
-    def search_achi_codes_v2(self, query_str: str, limit: int = 20) -> List[Dict]:
+    def _search_page(self, kind: str, query_str: str, limit: int, cursor: Optional[str],
+                     code_index: Optional[CodePrefixIndex], fts_table: Optional[str]) -> Dict:
         """
-        Search ACHI codes v2 with hierarchical context for autocomplete
+        Keyset pagination shared by the *_page search methods
+        Pages are ordered by code and resume with `code > last code`, so a deep
+        page costs the same as the first one (no OFFSET scan).
         """
-        if not self.conn:
-            self.connect()
+        start = time.perf_counter()
+        query_key = normalize_search_query(query_str)
+        query_class, plan = self.router.route(kind, query_key, bool(fts_table) and self._has_table(fts_table))
+        if cursor:
+            path, after = _decode_cursor(cursor, kind, query_key)
+        elif plan == 'rejected':
+            self.router.record(query_class, plan, time.perf_counter() - start)
+            return {'results': [], 'next_cursor': None}
+        else:
+            path, after = plan, ''
         
-        query_pattern = f"%{query_str}%"
-        
-        cursor = self.conn.execute("""
-            SELECT 
-                ac.code,
-                ac.description,
-                am.name as main_category,
-                asc.name as sub_category
-            FROM achi_codes_v2 ac
-            LEFT JOIN achi_main_categories am ON ac.main_category_code = am.code
-            LEFT JOIN achi_sub_categories asc ON ac.sub_category_id = asc.id
-            WHERE ac.code LIKE ? 
-               OR ac.description LIKE ?
-            ORDER BY ac.code
-            LIMIT ?
-        """, (query_pattern, query_pattern, limit))
-        
-        results = []
-        for row in cursor.fetchall():
-            category = f"{row['main_category']}"
-            if row['sub_category']:
-                category += f" / {row['sub_category']}"
-            
-            results.append({
-                'code': row['code'],
-                'description': row['description'],
-                'category': category
-            })
+        rows = []
+        if path == 'code':
+            rows = self._code_rows(kind, code_index, query_key, limit + 1, after=after)
+            if not rows and not cursor:
+                # Same fall-through as autocomplete: no code matches -> text search
+                path = 'fts' if _build_fts_query(query_key, self.synonym_expander) and self._has_table(fts_table) else 'like'
         
-        return results
+        if path != 'code':
+            with self._connection() as conn:
+                cursor_rows = conn.execute(PAGE_SEARCH_SQL[(kind, path)], {
+                    'match': _build_fts_query(query_key, self.synonym_expander),
+                    'pattern': f"%{query_key}%",
+                    'after': after,
+                    'limit': limit + 1
+                }).fetchall()
+            rows = [dict(row) for row in cursor_rows]
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor(kind, query_key, path, rows[-1]['code'])
+        
+        self.router.record(query_class, path, time.perf_counter() - start)
+        return {'results': rows, 'next_cursor': next_cursor}
+    
+    def search_icd_codes_page(self, query_str: str, limit: int = 20, cursor: str = None) -> Dict:
+        """
+        Keyset-paginated ICD search, ordered by code
+        Returns {'results': [...], 'next_cursor': str or None}
+        """
+        return self._search_page('icd', query_str, limit, cursor, self.icd_code_index, 'icd10am_codes_fts')
+    
+    def search_achi_codes_page(self, query_str: str, limit: int = 20, cursor: str = None) -> Dict:
+        """
+        Keyset-paginated ACHI search (original table), ordered by code
+        Returns {'results': [...], 'next_cursor': str or None}
+        """
+        return self._search_page('achi', query_str, limit, cursor, None, None)
+    
+    def search_achi_codes_v2_page(self, query_str: str, limit: int = 20, cursor: str = None) -> Dict:
+        """
+        Keyset-paginated ACHI v2 search with hierarchical context, ordered by code
+        Returns {'results': [...], 'next_cursor': str or None}
+        """
+        return self._search_page('achi_v2', query_str, limit, cursor, self.achi_code_index, 'achi_codes_v2_fts')
     
     def save_user_confirmed_relationship(self, icd_code: str, achi_code: str, 
                                         relationship: str, confidence: float, 
@@ -307,8 +1144,8 @@ class DatabaseManager:
         """
         Save user-confirmed validation to database for continuous learning
         """
-        if not self.conn:
-            self.connect()
+        if not self.writes_enabled:
+            return False
         
         # Get full code details
         icd_data = self.get_icd_with_category(icd_code)
@@ -317,26 +1154,27 @@ class DatabaseManager:
         if not icd_data or not achi_data:
             return False
         
-        # Insert if not exists
-        self.conn.execute("""
-            INSERT OR IGNORE INTO valid_relationships 
-            (icd_code, icd_description, icd_category, achi_code, achi_description, 
-             achi_category, relationship, confidence, category, source)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'user_confirmed')
-        """, (
-            icd_code,
-            icd_data['description'],
-            icd_category,
-            achi_code,
-            achi_data['short_description'],
-            achi_category,
-            relationship,
-            confidence,
-            f"{icd_category}|{achi_category}"
-        ))
-        
-        self.conn.commit()
-        return True
+        with self._write_connection() as conn:
+            # Insert if not exists
+            conn.execute("""
+                INSERT OR IGNORE INTO valid_relationships 
+                (icd_code, icd_description, icd_category, achi_code, achi_description, 
+                 achi_category, relationship, confidence, category, source)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'user_confirmed')
+            """, (
+                icd_code,
+                icd_data['description'],
+                icd_category,
+                achi_code,
+                achi_data['short_description'],
+                achi_category,
+                relationship,
+                confidence,
+                f"{icd_category}|{achi_category}"
+            ))
+            
+            conn.commit()
+            return True
 
 # Global database manager instance
 db_manager = DatabaseManager()
@@ -0,0 +1,148 @@
+"""
+Reference Code Store
+The ICD-10-AM / ACHI reference tables held in memory for O(1) code lookups
+"""
+import sys
+from typing import Dict, Optional
+
+from database.schema import has_icd_category_column, icd_category_resolver
+
+class IcdRecord:
+    """ICD-10-AM code with its resolved main category"""
+    __slots__ = ('code', 'description', 'category')
+
+    def __init__(self, code, description, category):
+        self.code = code
+        self.description = description
+        self.category = category
+
+class AchiRecord:
+    """ACHI code (original table) with its block"""
+    __slots__ = ('code', 'description', 'short_description', 'category', 'block_description')
+
+    def __init__(self, code, description, short_description, category, block_description):
+        self.code = code
+        self.description = description
+        self.short_description = short_description
+        self.category = category
+        self.block_description = block_description
+
+class AchiHierarchyRecord:
+    """ACHI v2 code with its main / sub category (one achi_search row)"""
+    __slots__ = ('code', 'description', 'main_category_code', 'main_category_name',
+                 'sub_category_name', 'sub_category_range')
+
+    def __init__(self, code, description, main_category_code, main_category_name,
+                 sub_category_name, sub_category_range):
+        self.code = code
+        self.description = description
+        self.main_category_code = main_category_code
+        self.main_category_name = main_category_name
+        self.sub_category_name = sub_category_name
+        self.sub_category_range = sub_category_range
+
+class ReferenceStore:
+    """
+    Code -> record dicts built once at startup
+
+    Category and hierarchy names are resolved while loading, so a lookup is
+    one dict access; records share their category strings.
+    """
+    def __init__(self, icd: Dict[str, IcdRecord], achi: Dict[str, AchiRecord],
+                 achi_hierarchy: Dict[str, AchiHierarchyRecord]):
+        self.icd = icd
+        self.achi = achi
+        self.achi_hierarchy = achi_hierarchy
+
+    @classmethod
+    def load(cls, conn):
+        """Read the reference tables (achi_search must exist, as table or view)"""
+        icd = {}
+        if has_icd_category_column(conn):
+            # One string per category, shared by its codes (a join would copy it into every row)
+            categories = dict(conn.execute("SELECT id, description FROM icd10_main_categories"))
+            for code, description, category_id in conn.execute(
+                "SELECT code, description, category_id FROM icd10am_codes"
+            ):
+                icd[code] = IcdRecord(code, description, categories.get(category_id))
+        else:
+            # Built before category_id existed: resolve the prefixes here
+            category_of = icd_category_resolver(conn.execute(
+                "SELECT code, description FROM icd10_main_categories ORDER BY rowid"
+            ).fetchall())
+            for code, description in conn.execute("SELECT code, description FROM icd10am_codes"):
+                icd[code] = IcdRecord(code, description, category_of(code))
+
+        blocks = {}
+        for block_id, short_desc, description in conn.execute(
+            "SELECT block_id, block_short_desc, block_description FROM code_blocks ORDER BY rowid"
+        ):
+            blocks.setdefault(block_id, (short_desc, description))
+
+        achi = {}
+        for code, description, short_description, block_id in conn.execute(
+            "SELECT code, description, short_description, block_id FROM achi_codes"
+        ):
+            block = blocks.get(block_id, (None, None))
+            achi.setdefault(code, AchiRecord(code, description, short_description, block[0], block[1]))
+
+        achi_hierarchy = {
+            row[0]: AchiHierarchyRecord(*row)
+            for row in conn.execute("""
+                SELECT code, description, main_category_code, main_category_name,
+                       sub_category_name, sub_category_range
+                FROM achi_search
+            """)
+        }
+        return cls(icd, achi, achi_hierarchy)
+
+    def icd_with_category(self, code: str) -> Optional[Dict]:
+        """Same result as DatabaseManager.get_icd_with_category"""
+        record = self.icd.get(code)
+        if record is None:
+            return None
+        return {
+            'code': record.code,
+            'description': record.description,
+            'category': record.category or 'Unknown'
+        }
+
+    def achi_with_category(self, code: str) -> Optional[Dict]:
+        """Same result as DatabaseManager.get_achi_with_category"""
+        record = self.achi.get(code)
+        if record is None:
+            return None
+        return {
+            'code': record.code,
+            'description': record.description,
+            'short_description': record.short_description,
+            'category': record.category or 'Unknown',
+            'block_description': record.block_description
+        }
+
+    def achi_with_hierarchy(self, code: str) -> Optional[Dict]:
+        """Same result as DatabaseManager.get_achi_with_hierarchy"""
+        record = self.achi_hierarchy.get(code)
+        if record is None:
+            return None
+        return {slot: getattr(record, slot) for slot in AchiHierarchyRecord.__slots__}
+
+    def counts(self) -> Dict[str, int]:
+        """Records per table"""
+        return {'icd': len(self.icd), 'achi': len(self.achi), 'achi_hierarchy': len(self.achi_hierarchy)}
+
+    def memory_bytes(self) -> int:
+        """
+        Deep size of the store: dicts, records and every distinct string
+        (shared strings are counted once)
+        """
+        seen = set()
+        total = 0
+        for table in (self.icd, self.achi, self.achi_hierarchy):
+            total += sys.getsizeof(table)
+            for code, record in table.items():
+                for obj in (code, record, *(getattr(record, slot) for slot in record.__slots__)):
+                    if id(obj) not in seen:
+                        seen.add(id(obj))
+                        total += sys.getsizeof(obj)
+        return total
@@ -0,0 +1,325 @@
+"""
+Derived Schema Objects
+Search indexes built from the reference tables once the Excel import is done
+"""
+import hashlib
+from collections import defaultdict
+from datetime import datetime
+from typing import List
+
+from database.trigram_index import tokenize_words, word_trigrams, pack_ids
+
+# FTS5 index -> reference table it indexes (external content, rowid = id)
+FTS_TABLES = {
+    'icd10am_codes_fts': 'icd10am_codes',
+    'achi_codes_v2_fts': 'achi_codes_v2',
+}
+
+# Description columns whose words feed the fuzzy-search vocabulary
+VOCABULARY_SOURCES = {
+    'icd10am_codes': 'description',
+    'achi_codes_v2': 'description',
+}
+
+# Reference tables whose contents define the dataset version (search results
+# and code lookups only change when one of these does)
+DATASET_VERSION_SOURCES = [
+    'icd10am_codes',
+    'icd10_main_categories',
+    'achi_codes',
+    'achi_codes_v2',
+    'achi_main_categories',
+    'achi_sub_categories',
+]
+
+# valid_relationships access paths: the exact pair lookup (get_exact_match)
+# and the best examples of a category pair (get_similar_examples, which
+# reads them in confidence order straight off the index, no sort)
+RELATIONSHIP_INDEXES = {
+    'idx_valid_rel_pair': 'valid_relationships(icd_code, achi_code)',
+    'idx_valid_rel_categories': 'valid_relationships(icd_category, achi_category, confidence DESC)',
+}
+
+# Flat ACHI row with its hierarchy resolved and the "main / sub" label prebuilt.
+# Materialized as achi_search at build time; older databases get the same
+# columns through a temporary view (see DatabaseManager.connect).
+ACHI_SEARCH_SELECT = """
+    SELECT 
+        ac.id,
+        ac.code,
+        ac.description,
+        am.code as main_category_code,
+        am.name as main_category_name,
+        asc.name as sub_category_name,
+        CASE WHEN asc.range_start != '' AND asc.range_end != ''
+             THEN asc.range_start || '-' || asc.range_end END as sub_category_range,
+        CASE WHEN asc.name != ''
+             THEN COALESCE(am.name, 'Unknown') || ' / ' || asc.name
+             ELSE COALESCE(am.name, 'Unknown') END as category
+    FROM achi_codes_v2 ac
+    LEFT JOIN achi_main_categories am ON ac.main_category_code = am.code
+    LEFT JOIN achi_sub_categories asc ON ac.sub_category_id = asc.id
+"""
+
+# How an ICD code joins its main category. Built databases store the
+# resolved category in icd10am_codes.category_id (indexed equality join);
+# older ones fall back to the prefix LIKE join it was derived from.
+ICD_CATEGORY_JOIN = "c.id = i.category_id"
+LEGACY_ICD_CATEGORY_JOIN = "c.code LIKE substr(i.code, 1, 3) || '%'"
+
+def _table_exists(cursor, table_name):
+    """Check sqlite_master for a table or virtual table"""
+    row = cursor.execute("""
+        SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?
+    """, (table_name,)).fetchone()
+    return row is not None
+
+def has_icd_category_column(cursor) -> bool:
+    """Check whether icd10am_codes carries the resolved category_id"""
+    columns = cursor.execute("PRAGMA table_info(icd10am_codes)").fetchall()
+    return any(column[1] == 'category_id' for column in columns)
+
+def icd_category_resolver(categories):
+    """
+    ICD code -> value of its main category, from (code, value) category rows
+    in rowid order. Same rule as LEGACY_ICD_CATEGORY_JOIN: the first category
+    whose code starts (case-insensitively) with the ICD code's first three
+    characters.
+    """
+    by_prefix = {}
+    for code, value in categories:
+        key = code.strip().upper()[:3]
+        if len(key) == 3:
+            by_prefix.setdefault(key, value)
+    
+    def resolve(icd_code):
+        prefix = icd_code[:3].upper()
+        if len(prefix) == 3:
+            return by_prefix.get(prefix)
+        return next((value for code, value in categories if code.upper().startswith(prefix)), None)
+    return resolve
+
+def build_fts_indexes(cursor):
+    """
+    Create FTS5 full-text indexes over code and description
+
+    External-content tables: only the inverted index is stored, the rows
+    stay in the reference tables. Prefix indexes make autocomplete prefix
+    tokens ("g45*", "chol*") a direct index lookup.
+    """
+    for fts_table, source_table in FTS_TABLES.items():
+        if not _table_exists(cursor, source_table):
+            print(f"- Skipped full-text index {fts_table} (no {source_table} table)")
+            continue
+
+        cursor.execute(f"DROP TABLE IF EXISTS {fts_table}")
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE {fts_table} USING fts5(
+                code,
+                description,
+                content='{source_table}',
+                content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='1 2 3'
+            )
+        """)
+        cursor.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+        print(f"+ Built full-text index: {fts_table}")
+
+def build_icd_category_column(cursor):
+    """
+    Resolve every ICD code's main category once into icd10am_codes.category_id
+    Category lookups then join on the indexed id instead of scanning
+    icd10_main_categories with a LIKE per code.
+    """
+    if not has_icd_category_column(cursor):
+        cursor.execute("ALTER TABLE icd10am_codes ADD COLUMN category_id INTEGER REFERENCES icd10_main_categories(id)")
+    
+    categories = cursor.execute("SELECT code, id FROM icd10_main_categories ORDER BY rowid").fetchall()
+    resolve = icd_category_resolver(categories)
+    codes = cursor.execute("SELECT rowid, code FROM icd10am_codes").fetchall()
+    cursor.executemany(
+        "UPDATE icd10am_codes SET category_id = ? WHERE rowid = ?",
+        [(resolve(code), rowid) for rowid, code in codes]
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_icd_category_id ON icd10am_codes(category_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_category_description ON icd10_main_categories(description)")
+    
+    resolved = cursor.execute("SELECT COUNT(*) FROM icd10am_codes WHERE category_id IS NOT NULL").fetchone()[0]
+    print(f"+ Resolved ICD categories: {resolved} of {len(codes)} codes")
+
+def build_relationship_indexes(cursor) -> List[str]:
+    """
+    Create the RELATIONSHIP_INDEXES that are missing
+    Returns the names of the indexes created
+    """
+    existing = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    created = []
+    for name, target in RELATIONSHIP_INDEXES.items():
+        if name not in existing:
+            cursor.execute(f"CREATE INDEX {name} ON {target}")
+            created.append(name)
+    if created:
+        print(f"+ Built relationship indexes: {', '.join(created)}")
+    return created
+
+def build_achi_search_table(cursor):
+    """
+    Materialize achi_search: one row per ACHI v2 code with hierarchy names
+    and the category label precomputed, so search and hierarchy lookups are
+    single-table reads. Shares ids with achi_codes_v2 (and its FTS rowids).
+    """
+    if not _table_exists(cursor, 'achi_codes_v2'):
+        print("- Skipped achi_search (no achi_codes_v2 table)")
+        return
+
+    cursor.execute("DROP TABLE IF EXISTS achi_search")
+    cursor.execute("""
+        CREATE TABLE achi_search (
+            id INTEGER PRIMARY KEY,
+            code TEXT UNIQUE NOT NULL,
+            description TEXT NOT NULL,
+            main_category_code TEXT,
+            main_category_name TEXT,
+            sub_category_name TEXT,
+            sub_category_range TEXT,
+            category TEXT NOT NULL
+        )
+    """)
+    cursor.execute(f"INSERT INTO achi_search {ACHI_SEARCH_SELECT}")
+    count = cursor.execute("SELECT COUNT(*) FROM achi_search").fetchone()[0]
+    print(f"+ Built achi_search: {count} codes with precomputed hierarchy")
+
+def build_trigram_index(cursor):
+    """
+    Build the trigram index used for typo-tolerant description search
+
+    Stored compactly as one row per distinct description word plus one row
+    per trigram holding its word ids as a packed uint32 array.
+    """
+    frequency = defaultdict(int)
+    for table, column in VOCABULARY_SOURCES.items():
+        if not _table_exists(cursor, table):
+            continue
+        for (text,) in cursor.execute(f"SELECT {column} FROM {table}").fetchall():
+            for word in tokenize_words(text or ''):
+                frequency[word] += 1
+
+    words = sorted(frequency)
+    postings = defaultdict(list)
+    for word_id, word in enumerate(words):
+        for trigram in word_trigrams(word):
+            postings[trigram].append(word_id)
+
+    cursor.execute("DROP TABLE IF EXISTS search_vocabulary")
+    cursor.execute("DROP TABLE IF EXISTS search_trigrams")
+    cursor.execute("""
+        CREATE TABLE search_vocabulary (
+            id INTEGER PRIMARY KEY,
+            word TEXT UNIQUE NOT NULL,
+            frequency INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE search_trigrams (
+            trigram TEXT PRIMARY KEY,
+            word_ids BLOB NOT NULL
+        ) WITHOUT ROWID
+    """)
+    cursor.executemany(
+        "INSERT INTO search_vocabulary (id, word, frequency) VALUES (?, ?, ?)",
+        [(word_id, word, frequency[word]) for word_id, word in enumerate(words)]
+    )
+    cursor.executemany(
+        "INSERT INTO search_trigrams (trigram, word_ids) VALUES (?, ?)",
+        [(trigram, pack_ids(ids)) for trigram, ids in postings.items()]
+    )
+    print(f"+ Built trigram index: {len(words)} words, {len(postings)} trigrams")
+
+def build_validation_result_cache(cursor):
+    """
+    Create validation_result_cache: AI validation results by ICD/ACHI pair,
+    model and prompt version, shared by all API workers and kept across
+    restarts (a model or prompt change simply misses)
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS validation_result_cache (
+            icd_code TEXT NOT NULL,
+            achi_code TEXT NOT NULL,
+            model TEXT NOT NULL,
+            prompt_version TEXT NOT NULL,
+            source TEXT NOT NULL,
+            result TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            expires_at REAL,
+            PRIMARY KEY (icd_code, achi_code, model, prompt_version)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_validation_cache_expires
+        ON validation_result_cache(expires_at) WHERE expires_at IS NOT NULL
+    """)
+    print("+ Built validation_result_cache")
+
+def compute_dataset_version(cursor) -> str:
+    """
+    Content hash of the reference tables (first 16 hex chars of SHA-256)
+    Tables are read in rowid order, so a rebuild from the same spreadsheets
+    yields the same version.
+    """
+    digest = hashlib.sha256()
+    for table in DATASET_VERSION_SOURCES:
+        if not _table_exists(cursor, table):
+            continue
+        digest.update(f"\x00{table}\x00".encode('utf-8'))
+        for row in cursor.execute(f"SELECT * FROM {table} ORDER BY rowid"):
+            digest.update(repr(tuple(row)).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+def stamp_dataset_version(cursor) -> str:
+    """
+    Record the dataset version in dataset_metadata
+    Run last in the build; the API derives its ETags from this value
+    """
+    version = compute_dataset_version(cursor)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS dataset_metadata (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    """)
+    cursor.executemany(
+        "INSERT OR REPLACE INTO dataset_metadata (key, value) VALUES (?, ?)",
+        [('dataset_version', version), ('built_at', datetime.now().isoformat(timespec='seconds'))]
+    )
+    print(f"+ Stamped dataset version: {version}")
+    return version
+
+def build_code_usage_table(cursor):
+    """
+    Create code_usage (validations per ICD / ACHI code) for popularity ranking
+    Kept up to date by the API on every validation; seeded here from
+    validation_test_log so existing history counts from day one.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS code_usage (
+            code_type TEXT NOT NULL,
+            code TEXT NOT NULL,
+            uses INTEGER NOT NULL DEFAULT 0,
+            last_used DATETIME,
+            PRIMARY KEY (code_type, code)
+        ) WITHOUT ROWID
+    """)
+    if not _table_exists(cursor, 'validation_test_log'):
+        return
+
+    for code_type, column in (('icd', 'icd_code'), ('achi', 'achi_code')):
+        cursor.execute(f"""
+            INSERT INTO code_usage (code_type, code, uses, last_used)
+            SELECT ?, UPPER(TRIM({column})), COUNT(*), MAX(timestamp)
+            FROM validation_test_log
+            GROUP BY UPPER(TRIM({column}))
+            ON CONFLICT (code_type, code) DO NOTHING
+        """, (code_type,))
+    count = cursor.execute("SELECT COUNT(*) FROM code_usage").fetchone()[0]
+    print(f"+ Built code_usage: {count} codes with validation history")
@@ -0,0 +1,98 @@
+"""
+Search Cache
+LRU cache of autocomplete candidates that answers longer queries by narrowing
+"""
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+def normalize_search_query(query_str: str) -> str:
+    """Cache key form of a query: lower-case, single spaces"""
+    return ' '.join(query_str.lower().split())
+
+class SearchCache:
+    """
+    Keystroke-friendly search cache
+
+    Each entry holds up to `candidate_limit` rows for one (kind, query) and
+    the search path that produced them. An entry with fewer rows than the
+    limit is the complete match set, so a longer query on the same path
+    ("G45" -> "G45.") is answered by filtering those rows instead of
+    querying SQLite again. Narrowed rows keep the order of the entry they
+    were filtered from, so callers only narrow paths whose order doesn't
+    depend on the query.
+    """
+    def __init__(self, max_entries: int = 2048, candidate_limit: int = 200):
+        self.max_entries = max_entries
+        self.candidate_limit = candidate_limit
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.narrowed_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, kind: str, query_key: str, path: str,
+               matcher: Optional[Callable[[str, Dict], bool]]) -> Optional[List[Dict]]:
+        """
+        Return cached candidates for query_key, or None on a miss
+
+        path is the search path the query would take; matcher(query_key, row)
+        must reproduce that path's match rule so narrowed results are exact
+        (None: exact hits only, no narrowing).
+        """
+        with self.lock:
+            entry = self.entries.get((kind, query_key))
+            if entry is not None:
+                self.entries.move_to_end((kind, query_key))
+                self.hits += 1
+                return entry['rows']
+
+            # Longest cached prefix with a complete result set on the same path
+            for end in range(len(query_key) - 1 if matcher else 0, 0, -1):
+                prefix_entry = self.entries.get((kind, query_key[:end]))
+                if prefix_entry is None or not prefix_entry['complete'] or prefix_entry['path'] != path:
+                    continue
+
+                rows = [row for row in prefix_entry['rows'] if matcher(query_key, row)]
+                if not rows and path == 'code':
+                    # An empty code-prefix result falls through to text search
+                    break
+
+                self._put((kind, query_key), rows, True, path)
+                self.narrowed_hits += 1
+                return rows
+
+            self.misses += 1
+            return None
+
+    def store(self, kind: str, query_key: str, path: str, rows: List[Dict]):
+        """Cache candidates fetched with LIMIT candidate_limit"""
+        with self.lock:
+            self._put((kind, query_key), rows, len(rows) < self.candidate_limit, path)
+
+    def _put(self, key, rows, complete, path):
+        self.entries[key] = {'rows': rows, 'complete': complete, 'path': path}
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for monitoring"""
+        with self.lock:
+            lookups = self.hits + self.narrowed_hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'narrowed_hits': self.narrowed_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round((self.hits + self.narrowed_hits) / lookups, 4) if lookups else 0.0
+            }
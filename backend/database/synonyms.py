@@ -0,0 +1,78 @@
+"""
+Clinical Synonym Expansion
+Abbreviations and lay terms ("TIA", "heart attack") mapped to the wording used
+in the ICD-10-AM / ACHI descriptions
+"""
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Dict, List
+
+DEFAULT_SYNONYMS_PATH = Path(__file__).parent.parent / 'data' / 'clinical_synonyms.json'
+
+def _tokens(text: str) -> List[str]:
+    """Same tokenization as the FTS query builder"""
+    return re.findall(r'[^\W_]+', text.lower())
+
+class SynonymExpander:
+    """
+    Expansion index compiled from the synonym dictionary
+
+    Keys are normalized token strings ("tia", "heart attack"); a query is
+    scanned left to right taking the longest key at each position, so
+    expansion costs a few dict lookups per query term.
+    """
+    def __init__(self, entries: Dict[str, List[str]]):
+        self.index = {}
+        for key, expansions in entries.items():
+            key_tokens = ' '.join(_tokens(key))
+            if not key_tokens:
+                continue
+            alternatives = self.index.setdefault(key_tokens, [])
+            for expansion in expansions:
+                expansion_tokens = _tokens(expansion)
+                if expansion_tokens and expansion_tokens not in alternatives:
+                    alternatives.append(expansion_tokens)
+        self.max_key_terms = max((len(key.split()) for key in self.index), default=0)
+        # Changes whenever the compiled dictionary does (part of search ETags)
+        self.version = hashlib.sha256(
+            json.dumps(self.index, sort_keys=True).encode('utf-8')
+        ).hexdigest()[:8]
+
+    @classmethod
+    def load(cls, path=None):
+        """Compile the dictionary file (abbreviations + synonyms sections)"""
+        with open(path or DEFAULT_SYNONYMS_PATH, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        entries = {}
+        for section in ('abbreviations', 'synonyms'):
+            for key, expansions in data.get(section, {}).items():
+                entries.setdefault(key, []).extend(expansions)
+        return cls(entries)
+
+    def __len__(self):
+        return len(self.index)
+
+    def expand(self, terms: List[List[str]]) -> List[List[List[str]]]:
+        """
+        Group query terms (each a token list) into alternatives
+
+        Returns one group per matched span or unmatched term; the first
+        alternative is always the original tokens, followed by expansions.
+        """
+        groups = []
+        i = 0
+        while i < len(terms):
+            for span in range(min(self.max_key_terms, len(terms) - i), 0, -1):
+                span_tokens = [token for term in terms[i:i + span] for token in term]
+                expansions = self.index.get(' '.join(span_tokens))
+                if expansions:
+                    groups.append([span_tokens] + expansions)
+                    i += span
+                    break
+            else:
+                groups.append([terms[i]])
+                i += 1
+        return groups
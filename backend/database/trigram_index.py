@@ -0,0 +1,96 @@
+"""
+Trigram Index
+Typo-tolerant matching of query terms against the description vocabulary
+"""
+import re
+import sys
+from array import array
+from collections import Counter
+from itertools import chain
+from typing import Dict, List, Tuple
+
+# Terms shorter than this are matched exactly (too few trigrams to correct)
+MIN_FUZZY_TERM_LENGTH = 3
+
+# Minimum trigram (Jaccard) similarity for a vocabulary word to count as a match
+SIMILARITY_THRESHOLD = 0.3
+
+def tokenize_words(text: str) -> List[str]:
+    """Split a description or query into lower-case alphabetic words"""
+    return re.findall(r'[a-z]+', text.lower())
+
+def word_trigrams(word: str) -> set:
+    """Padded trigrams of a word ("tia" -> "  t", " ti", "tia", "ia ")"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def pack_ids(ids) -> bytes:
+    """Pack sorted word ids as little-endian uint32 for BLOB storage"""
+    packed = array('I', ids)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+def unpack_ids(blob: bytes) -> array:
+    """Inverse of pack_ids"""
+    ids = array('I')
+    ids.frombytes(blob)
+    if sys.byteorder == 'big':
+        ids.byteswap()
+    return ids
+
+class TrigramIndex:
+    """
+    In-memory trigram -> word id postings over the description vocabulary
+
+    The vocabulary (~12k distinct words) is far smaller than the number of
+    descriptions (71k+), so a lookup only touches the postings of the query
+    term's own trigrams, independent of how many codes are indexed.
+    """
+    def __init__(self, words: List[str], postings: Dict[str, array]):
+        self.words = words
+        self.word_ids = {word: i for i, word in enumerate(words)}
+        self.trigram_counts = [len(word_trigrams(word)) for word in words]
+        self.postings = postings
+
+    @classmethod
+    def load(cls, conn):
+        """Load the index written by schema.build_trigram_index"""
+        words = [row[0] for row in conn.execute("SELECT word FROM search_vocabulary ORDER BY id")]
+        postings = {
+            trigram: unpack_ids(blob)
+            for trigram, blob in conn.execute("SELECT trigram, word_ids FROM search_trigrams")
+        }
+        return cls(words, postings)
+
+    def __len__(self):
+        return len(self.words)
+
+    def similar_words(self, term: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """
+        Vocabulary words most similar to term, best first
+        Returns (word, similarity) pairs with similarity >= SIMILARITY_THRESHOLD
+        """
+        term = term.lower()
+        if len(term) < MIN_FUZZY_TERM_LENGTH:
+            return [(term, 1.0)] if term in self.word_ids else []
+
+        term_trigrams = word_trigrams(term)
+        shared = Counter(chain.from_iterable(
+            self.postings.get(trigram, ()) for trigram in term_trigrams
+        ))
+
+        # Words sharing fewer trigrams than this can't reach the threshold
+        # whatever their length; skips most of the candidates cheaply
+        min_shared = SIMILARITY_THRESHOLD * (len(term_trigrams) + 2) / (1 + SIMILARITY_THRESHOLD)
+
+        matches = []
+        for word_id, count in shared.items():
+            if count < min_shared:
+                continue
+            similarity = count / (len(term_trigrams) + self.trigram_counts[word_id] - count)
+            if similarity >= SIMILARITY_THRESHOLD:
+                matches.append((self.words[word_id], similarity))
+
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches[:limit]
@@ -0,0 +1,78 @@
+"""
+Database profile benchmark
+Lookup and search latency under each DATABASE_PROFILE (default,
+read_optimized, immutable) against the same database file, and code
+lookups through the in-memory reference store
+
+Run from backend/: python tests/benchmark_profiles.py [path/to/validation.db]
+"""
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmark_search import print_row, time_call
+from database.profiles import DATABASE_PROFILES
+from database.queries import DatabaseManager
+
+ICD_CODES = ["G45.9", "J13.0", "E11.9", "I21.4", "K35.8"]
+ACHI_CODES = ["39000-00", "30445-00", "92209-00", "48418-00"]
+TEXT_QUERIES = ["pneumonia", "fracture femur", "diabetes"]
+
+def benchmark_profile(db_path, profile):
+    """Median/p95 per operation for one profile"""
+    db = DatabaseManager(db_path, profile=profile)
+    start = time.perf_counter()
+    db.connect()
+    warmed = db.warm_page_cache()
+    print(f"\n{profile} (connect + warm-up {(time.perf_counter() - start) * 1000:.1f} ms, "
+          f"{warmed / (1024 * 1024):.1f} MB pre-read)")
+
+    operations = [
+        ("icd+category", "5 codes", lambda: [db.get_icd_with_category(code) for code in ICD_CODES]),
+        ("achi+hierarchy", "4 codes", lambda: [db.get_achi_with_hierarchy(code) for code in ACHI_CODES]),
+        ("exact match", "4 pairs", lambda: [db.get_exact_match("G45.9", code) for code in ACHI_CODES]),
+    ]
+    for query_str in TEXT_QUERIES:
+        # Page search bypasses the search cache, so every call hits SQLite
+        operations.append(("fts page", query_str[:10], lambda q=query_str: db.search_icd_codes_page(q, 20)))
+    operations.append(("LIKE scan", "achi v1", lambda: db.search_achi_codes("puncture", 20)))
+
+    for label, detail, fn in operations:
+        print_row(label, detail, *time_call(fn, repeat=100))
+    db.close()
+
+def benchmark_reference_store(db_path):
+    """SQL lookups vs the in-memory reference store"""
+    db = DatabaseManager(db_path)
+    db.connect()
+    start = time.perf_counter()
+    counts = db.load_reference_store()
+    print(f"\nreference store ({counts['icd']} ICD / {counts['achi']} ACHI / {counts['achi_hierarchy']} ACHI v2 "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms, "
+          f"{db.reference_store.memory_bytes() / (1024 * 1024):.1f} MB)")
+
+    store, db.reference_store = db.reference_store, None
+    for label in ("sql", "in-memory"):
+        print_row(f"{label} icd", "5 codes", *time_call(lambda: [db.get_icd_with_category(code) for code in ICD_CODES]))
+        print_row(f"{label} achi", "4 codes", *time_call(lambda: [db.get_achi_with_category(code) for code in ACHI_CODES]))
+        print_row(f"{label} hier", "4 codes", *time_call(lambda: [db.get_achi_with_hierarchy(code) for code in ACHI_CODES]))
+        db.reference_store = store
+    db.close()
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else None
+    probe = DatabaseManager(db_path)
+    if not Path(probe.db_path).exists():
+        print(f"X Database not found at {probe.db_path}")
+        return
+
+    print(f"Database profile benchmark ({probe.db_path})")
+    for profile in DATABASE_PROFILES:
+        benchmark_profile(probe.db_path, profile)
+    benchmark_reference_store(probe.db_path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+valid_relationships benchmark
+get_exact_match / get_similar_examples latency as the table grows to 1M
+rows, with and without the RELATIONSHIP_INDEXES
+
+Builds a synthetic table in a temporary database (the real one is untouched)
+Run from backend/: python tests/benchmark_relationships.py [max_rows]
+"""
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmark_search import print_row, time_call
+from database.queries import DatabaseManager
+from database.schema import RELATIONSHIP_INDEXES, build_relationship_indexes
+
+SIZES = [10_000, 100_000, 1_000_000]
+ICD_CODES = [f"{letter}{n:02d}.{d}" for letter in "ABCDEGIJKMNRSZ" for n in range(100) for d in range(10)]
+ACHI_CODES = [f"{n:05d}-{s:02d}" for n in range(30000, 32000) for s in range(3)]
+ICD_CATEGORIES = 1_500
+ACHI_CATEGORIES = 400
+
+def create_table(conn):
+    """Same columns as the setup scripts' valid_relationships"""
+    conn.execute("""
+        CREATE TABLE valid_relationships (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            icd_code TEXT NOT NULL,
+            icd_description TEXT NOT NULL,
+            icd_category TEXT NOT NULL,
+            achi_code TEXT NOT NULL,
+            achi_description TEXT NOT NULL,
+            achi_category TEXT NOT NULL,
+            relationship TEXT NOT NULL,
+            confidence FLOAT NOT NULL,
+            category TEXT NOT NULL,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            source TEXT DEFAULT 'ai_generated'
+        )
+    """)
+
+def synthetic_rows(rng, count):
+    """Random user-confirmed pairs over ~14K ICD / 6K ACHI codes and their categories"""
+    for _ in range(count):
+        icd_index = rng.randrange(len(ICD_CODES))
+        achi_index = rng.randrange(len(ACHI_CODES))
+        icd_category = f"ICD category {icd_index % ICD_CATEGORIES}"
+        achi_category = f"ACHI block {achi_index % ACHI_CATEGORIES}"
+        yield (
+            ICD_CODES[icd_index], f"Diagnosis {icd_index}", icd_category,
+            ACHI_CODES[achi_index], f"Procedure {achi_index}", achi_category,
+            'VALID', round(rng.random(), 3), f"{icd_category} + {achi_category}", 'user_confirmed'
+        )
+
+def grow(conn, rng, count):
+    """Append count rows (indexes dropped first, bulk insert is faster without them)"""
+    for name in RELATIONSHIP_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.executemany("""
+        INSERT INTO valid_relationships
+        (icd_code, icd_description, icd_category, achi_code, achi_description,
+         achi_category, relationship, confidence, category, source)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, synthetic_rows(rng, count))
+    conn.commit()
+
+def benchmark_size(db, probes, rows):
+    """Median/p95 of both hot queries before and after indexing"""
+    pairs, categories = probes
+    repeat = 20 if rows >= 1_000_000 else 50
+    for indexed in (False, True):
+        if indexed:
+            start = time.perf_counter()
+            build_relationship_indexes(db.conn.cursor())
+            db.conn.commit()
+            print(f"  (indexes built in {(time.perf_counter() - start) * 1000:.0f} ms)")
+            # Reconnect so the pooled connections plan with the new indexes
+            db.close()
+            db.connect()
+        label = "index" if indexed else "scan"
+        print_row(f"exact {label}", "5 pairs",
+                  *time_call(lambda: [db.get_exact_match(icd, achi) for icd, achi in pairs], repeat=repeat))
+        print_row(f"similar {label}", "5 pairs",
+                  *time_call(lambda: [db.get_similar_examples(icd, achi) for icd, achi in categories], repeat=repeat))
+
+def main():
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else SIZES[-1]
+    rng = random.Random(42)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / 'relationships.db')
+        conn = sqlite3.connect(db_path)
+        create_table(conn)
+        db = DatabaseManager(db_path)
+
+        print("valid_relationships benchmark")
+        rows = 0
+        for size in [s for s in SIZES if s < max_rows] + [max_rows]:
+            start = time.perf_counter()
+            grow(conn, rng, size - rows)
+            rows = size
+            print(f"\n{rows:,} rows (inserted in {time.perf_counter() - start:.1f} s)")
+
+            db.connect()
+            sample = db.conn.execute("""
+                SELECT icd_code, achi_code, icd_category, achi_category
+                FROM valid_relationships ORDER BY random() LIMIT 5
+            """).fetchall()
+            probes = ([(r[0], r[1]) for r in sample], [(r[2], r[3]) for r in sample])
+            benchmark_size(db, probes, rows)
+            db.close()
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Autocomplete search benchmark
+Compares the in-memory code prefix index and the indexed code range scan
+(used when the index isn't loaded) against the SQLite LIKE scan
+and measures typo-tolerant (trigram) search and synonym expansion latency
+
+Run from backend/: python tests/benchmark_search.py [path/to/validation.db]
+"""
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.queries import DatabaseManager, _build_fts_query
+
+ICD_PREFIXES = ["G4", "G45", "G45.", "G45.9", "J45", "K02.9", "I21", "Z51.1"]
+ACHI_PREFIXES = ["3900", "39006", "39006-0", "9220", "92209-00", "5231"]
+CLINICAL_QUERIES = ["TIA", "CABG", "MI", "COPD", "heart attack", "acute mi", "pneumonia", "fracture of femur"]
+MISSPELLINGS = ["pnuemonia", "cholecystectmy", "diabetis mellitis", "astma", "fractre femur"]
+
+def time_call(fn, repeat=200):
+    """Run fn repeatedly and return (median, p95) latency in microseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+def like_search(db, table, query_str, limit=20):
+    """The original LIKE '%q%' autocomplete query"""
+    pattern = f"%{query_str}%"
+    return db.conn.execute(f"""
+        SELECT code, description FROM {table}
+        WHERE code LIKE ? OR description LIKE ?
+        ORDER BY code
+        LIMIT ?
+    """, (pattern, pattern, limit)).fetchall()
+
+def print_row(label, query_str, median, p95):
+    print(f"  {label:<14} {query_str:<10} median {median:>10.1f} us   p95 {p95:>10.1f} us")
+
+def benchmark_code_prefixes(db):
+    """Prefix index vs LIKE scan for code-shaped autocomplete input"""
+    print("\nCode prefix lookups")
+    print("=" * 70)
+
+    load_start = time.perf_counter()
+    icd_count, achi_count = db.load_code_indexes()
+    print(f"Loaded {icd_count} ICD / {achi_count} ACHI codes in "
+          f"{(time.perf_counter() - load_start) * 1000:.1f} ms")
+
+    for kind, table, index, prefixes in (
+        ('icd', 'icd10am_codes', db.icd_code_index, ICD_PREFIXES),
+        ('achi_v2', 'achi_codes_v2', db.achi_code_index, ACHI_PREFIXES),
+    ):
+        print(f"\n{table}")
+        for prefix in prefixes:
+            print_row("prefix index", prefix, *time_call(lambda: index.prefix_search(prefix, 20)))
+            print_row("range scan", prefix, *time_call(lambda: db._code_rows(kind, None, prefix, 20)))
+            print_row("LIKE scan", prefix, *time_call(lambda: like_search(db, table, prefix), repeat=20))
+
+def benchmark_fuzzy_search(db):
+    """Typo-tolerant description search through the trigram index"""
+    print("\nFuzzy description search")
+    print("=" * 70)
+
+    vocabulary_size = db.load_trigram_index()
+    if not vocabulary_size:
+        print("No trigram index in this database (rebuild with database_setup_v2.py)")
+        return
+    print(f"Vocabulary: {vocabulary_size} words")
+
+    for query_str in MISSPELLINGS:
+        top = db.search_icd_codes(query_str, 3, fuzzy=True)
+        print(f"\n  {query_str!r} -> {[r['code'] for r in top]}")
+        print_row("icd fuzzy", query_str[:10], *time_call(lambda: db.search_icd_codes(query_str, 20, fuzzy=True), repeat=50))
+        print_row("achi fuzzy", query_str[:10], *time_call(lambda: db.search_achi_codes_v2(query_str, 20, fuzzy=True), repeat=50))
+
+def benchmark_synonym_expansion(db):
+    """Cost of abbreviation/synonym expansion on top of building the FTS query"""
+    print("\nSynonym expansion")
+    print("=" * 70)
+
+    load_start = time.perf_counter()
+    synonym_count = db.load_synonyms()
+    print(f"Compiled {synonym_count} terms in {(time.perf_counter() - load_start) * 1000:.2f} ms")
+
+    for query_str in CLINICAL_QUERIES:
+        print(f"\n  {query_str!r} -> {_build_fts_query(query_str, db.synonym_expander)}")
+        print_row("plain", query_str[:10], *time_call(lambda: _build_fts_query(query_str)))
+        print_row("expanded", query_str[:10], *time_call(lambda: _build_fts_query(query_str, db.synonym_expander)))
+
+def main():
+    db = DatabaseManager(sys.argv[1] if len(sys.argv) > 1 else None)
+    try:
+        db.connect()
+    except Exception as e:
+        print(f"X Database connection failed: {e}")
+        return
+
+    print(f"Autocomplete search benchmark ({db.db_path})")
+    benchmark_code_prefixes(db)
+    benchmark_fuzzy_search(db)
+    benchmark_synonym_expansion(db)
+    db.close()
+
+if __name__ == "__main__":
+    main()
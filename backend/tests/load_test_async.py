@@ -0,0 +1,108 @@
+"""
+Async endpoint load test
+Search latency under concurrent clients while /api/validate requests are in
+flight: validations awaiting the model asynchronously (current endpoint) vs.
+validations blocking the event loop (how the endpoint used to behave)
+
+Drives the app in-process through httpx's ASGI transport against the real
+database, with the search cache bypassed so every search is a SQLite read on
+the database executor and connection pool. The validator is swapped for a stand-in that waits
+VALIDATION_DELAY seconds like an LLM round trip, so no API key is needed.
+
+Run from backend/: python tests/load_test_async.py [search_clients] [validations_in_flight]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault('OPENAI_API_KEY', 'load-test')
+
+import httpx
+
+import app as api
+
+VALIDATION_DELAY = 0.5
+SEARCHES_PER_CLIENT = 40
+# Text queries: code-shaped ones are answered from the in-memory prefix index
+SEARCH_QUERIES = ["pneumonia", "fracture femur", "diabetes", "heart attack", "puncture", "lung", "cataract", "sepsis"]
+
+STAND_IN_RESULT = {
+    'is_valid': True, 'confidence': 0.9, 'reasoning': 'load test', 'certainty_explanation': '',
+    'source': 'load_test', 'similar_examples_count': 0
+}
+
+async def async_validate(icd_code, achi_code, run_blocking=None):
+    """Stand-in for rag_validator.avalidate: awaits like an async LLM call"""
+    await asyncio.sleep(VALIDATION_DELAY)
+    return dict(STAND_IN_RESULT)
+
+async def blocking_validate(icd_code, achi_code, run_blocking=None):
+    """The old endpoint behaviour: a blocking LLM call on the event loop"""
+    time.sleep(VALIDATION_DELAY)
+    return dict(STAND_IN_RESULT)
+
+async def search_client(client, client_id, requests, latencies):
+    """Sequential /api/search requests, recording each latency (ms)"""
+    for i in range(requests):
+        query = SEARCH_QUERIES[(client_id + i) % len(SEARCH_QUERIES)]
+        start = time.perf_counter()
+        response = await client.get("/api/search", params={"q": query, "limit": 10 + (client_id * 7 + i) % 50})
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+async def validation_client(client, stop):
+    """Keep one /api/validate request in flight until stop is set"""
+    while not stop.is_set():
+        await client.post("/api/validate", json={"icd_code": "LOADTEST", "achi_code": "LOADTEST"})
+
+async def run_phase(client, label, search_clients, validations, requests=SEARCHES_PER_CLIENT):
+    """Search latency with `validations` validation clients running alongside"""
+    stop = asyncio.Event()
+    validators = [asyncio.create_task(validation_client(client, stop)) for _ in range(validations)]
+    if validations:
+        await asyncio.sleep(0.05)
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(search_client(client, i, requests, latencies) for i in range(search_clients)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await asyncio.gather(*validators)
+
+    latencies.sort()
+    print(f"  {label:<34} median {statistics.median(latencies):>8.1f} ms   "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1]:>8.1f} ms   "
+          f"{len(latencies) / elapsed:>7.1f} searches/s")
+
+async def main():
+    search_clients = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    validations = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    await api.startup_event()
+    # Every search goes to SQLite: limits above candidate_limit bypass the search cache
+    api.db_manager.search_cache.candidate_limit = 0
+    api.rag_validator.avalidate = async_validate
+    # Still dispatched to the database executor, but nothing is written to the log tables
+    api.log_validation_result = lambda icd_code, achi_code, result: None
+
+    print(f"\n{search_clients} search clients x {SEARCHES_PER_CLIENT} requests, "
+          f"{validations} validations in flight ({VALIDATION_DELAY}s each)")
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=120) as client:
+        await run_phase(client, "searches only", search_clients, 0)
+        await run_phase(client, "+ validations (async)", search_clients, validations)
+
+        api.rag_validator.avalidate = blocking_validate
+        # Every search now waits behind whole validations, so keep this phase short
+        await run_phase(client, "+ validations (inline, blocking)", search_clients, validations, requests=3)
+        api.rag_validator.avalidate = async_validate
+
+    await api.shutdown_event()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,144 @@
+"""
+LLM validation concurrency test
+Concurrent validations that all need a model call: the blocking OpenAI client
+on the validation thread pool (how /api/validate used to run) vs. the async
+client behind the LLM_CONCURRENCY semaphore (current endpoint), both allowed
+the same number of model calls at once
+
+At equal concurrency throughput is the same; the difference is that the
+blocking client holds a worker thread for every call in flight while the
+async client holds none. That is what keeps search latency flat while
+validations run (see load_test_async.py).
+
+Drives the app in-process through httpx's ASGI transport against the real
+database, with both OpenAI clients replaced by a fake backend that answers
+after LLM_DELAY seconds, so no API key is needed. Nothing is written to the
+database (logging and the persistent result cache are switched off).
+
+Run from backend/: python tests/load_test_llm.py [validations] [concurrency]
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault('OPENAI_API_KEY', 'load-test')
+# Same limit for both: validation threads (sync) and model calls in flight (async)
+CONCURRENCY = sys.argv[2] if len(sys.argv) > 2 else '8'
+os.environ['VALIDATION_WORKERS'] = CONCURRENCY
+os.environ['LLM_CONCURRENCY'] = CONCURRENCY
+
+import httpx
+
+import app as api
+
+LLM_DELAY = 0.5
+FAKE_ANSWER = json.dumps({
+    'is_valid': True, 'confidence': 0.8, 'reasoning': 'load test', 'certainty_explanation': 'fake model'
+})
+
+def fake_response() -> SimpleNamespace:
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=FAKE_ANSWER))])
+
+class FakeCompletions:
+    """chat.completions stand-in that answers after LLM_DELAY seconds"""
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self.blocked_threads = 0
+        self.peak_blocked_threads = 0
+        self.lock = threading.Lock()
+
+    def _start(self):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+
+    def create(self, **kwargs):
+        with self.lock:
+            self._start()
+            self.blocked_threads += 1
+            self.peak_blocked_threads = max(self.peak_blocked_threads, self.blocked_threads)
+        time.sleep(LLM_DELAY)
+        with self.lock:
+            self.in_flight -= 1
+            self.blocked_threads -= 1
+        return fake_response()
+
+    async def acreate(self, **kwargs):
+        self._start()
+        await asyncio.sleep(LLM_DELAY)
+        self.in_flight -= 1
+        return fake_response()
+
+def install_fake_llm(completions: FakeCompletions):
+    """Point both OpenAI clients of the validator at the fake backend"""
+    validator = api.rag_validator
+    validator.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=completions.create)))
+    validator.async_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=completions.acreate)))
+
+def uncached_pairs(count: int):
+    """ICD/ACHI pairs without an exact match, so every validation asks the model"""
+    conn = api.db_manager.conn
+    icd_codes = [row['code'] for row in conn.execute("SELECT code FROM icd10am_codes ORDER BY id LIMIT ?", (count,))]
+    achi_codes = [row['code'] for row in conn.execute("SELECT code FROM achi_codes ORDER BY rowid LIMIT ?", (count,))]
+    pairs = []
+    for icd_code, achi_code in zip(icd_codes, achi_codes):
+        if not api.db_manager.get_exact_match(icd_code, achi_code):
+            pairs.append((icd_code, achi_code))
+    return pairs
+
+def report(label: str, count: int, elapsed: float, completions: FakeCompletions):
+    print(f"  {label:<34} {elapsed:>6.2f} s   {count / elapsed:>7.1f} validations/s   "
+          f"peak {completions.peak:>3} model calls in flight, "
+          f"{completions.peak_blocked_threads:>3} threads blocked on them")
+
+async def run_threads(pairs):
+    """The old endpoint: blocking validate() on the validation executor"""
+    completions = FakeCompletions()
+    install_fake_llm(completions)
+    api.rag_validator.cache.clear()
+    start = time.perf_counter()
+    await asyncio.gather(*(api.run_validation(api.rag_validator.validate, *pair) for pair in pairs))
+    report(f"sync client, {api.validation_executor._max_workers} threads", len(pairs),
+           time.perf_counter() - start, completions)
+
+async def run_async(client, pairs):
+    """The current endpoint: POST /api/validate with the async client"""
+    completions = FakeCompletions()
+    install_fake_llm(completions)
+    api.rag_validator.cache.clear()
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(
+        client.post("/api/validate", json={"icd_code": icd_code, "achi_code": achi_code})
+        for icd_code, achi_code in pairs
+    ))
+    for response in responses:
+        response.raise_for_status()
+    report(f"async client, LLM_CONCURRENCY={api.rag_validator.llm_concurrency}", len(pairs),
+           time.perf_counter() - start, completions)
+
+async def main():
+    validations = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+
+    await api.startup_event()
+    api.log_validation_result = lambda icd_code, achi_code, result: None
+    api.rag_validator.persistent_cache.get = lambda icd_code, achi_code: None
+    api.rag_validator.persistent_cache.put = lambda icd_code, achi_code, result: None
+
+    pairs = uncached_pairs(validations)
+    print(f"\n{len(pairs)} concurrent validations, each needing a model call ({LLM_DELAY}s each)")
+    await run_threads(pairs)
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=120) as client:
+        await run_async(client, pairs)
+
+    await api.shutdown_event()
+
+if __name__ == "__main__":
+    asyncio.run(main())
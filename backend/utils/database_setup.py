@@ -5,8 +5,15 @@ Converts 4 Excel files into unified SQLite database with complete schema
 import sqlite3
 import pandas as pd
 import os
+import sys
 from pathlib import Path
 
+# Add backend directory to path for shared schema helpers
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.migrations import apply_migrations
+from database.schema import stamp_dataset_version
+
 def create_database():
     """
     Create SQLite database from 4 Excel files
@@ -38,7 +45,8 @@ def create_database():
         CREATE TABLE icd10am_codes (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             code TEXT UNIQUE NOT NULL,
-            description TEXT NOT NULL
+            description TEXT NOT NULL,
+            category_id INTEGER REFERENCES icd10_main_categories(id)
         )
     """)
     print("✓ Created table: icd10am_codes")
@@ -117,9 +125,7 @@ def create_database():
     cursor.execute("CREATE INDEX idx_achi_code ON achi_codes(code)")
     cursor.execute("CREATE INDEX idx_achi_desc ON achi_codes(short_description)")
     cursor.execute("CREATE INDEX idx_category_code ON icd10_main_categories(code)")
-    cursor.execute("CREATE INDEX idx_valid_rel_icd ON valid_relationships(icd_code)")
     cursor.execute("CREATE INDEX idx_valid_rel_achi ON valid_relationships(achi_code)")
-    cursor.execute("CREATE INDEX idx_valid_rel_icd_cat ON valid_relationships(icd_category)")
     cursor.execute("CREATE INDEX idx_valid_rel_achi_cat ON valid_relationships(achi_category)")
     cursor.execute("CREATE INDEX idx_valid_rel_category ON valid_relationships(category)")
     print("✓ Created all indexes")
@@ -214,6 +220,11 @@ def create_database():
     except Exception as e:
         print(f"✗ Error importing ICD10 Main Categories: {e}")
     
+    # 5. Search indexes and derived columns, as schema migrations
+    print("\nBuilding search indexes...")
+    apply_migrations(conn)
+    stamp_dataset_version(cursor)
+    
     conn.commit()
     conn.close()
     
@@ -5,9 +5,16 @@ Integrates new ACHI-10th Edition hierarchical data while keeping original tables
 import sqlite3
 import pandas as pd
 import os
+import sys
 from pathlib import Path
 from parse_new_achi import parse_achi_10th_edition
 
+# Add backend directory to path for shared schema helpers
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.migrations import apply_migrations
+from database.schema import stamp_dataset_version
+
 def create_database_v2():
     """
     Create enhanced SQLite database with hierarchical ACHI structure
@@ -23,6 +30,7 @@ def create_database_v2():
     db_path = data_dir / 'validation.db'
     
     # Backup existing database
+    backup_path = None
     if db_path.exists():
         backup_path = data_dir / 'validation_backup.db'
         if backup_path.exists():
@@ -42,7 +50,8 @@ def create_database_v2():
         CREATE TABLE icd10am_codes (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             code TEXT UNIQUE NOT NULL,
-            description TEXT NOT NULL
+            description TEXT NOT NULL,
+            category_id INTEGER REFERENCES icd10_main_categories(id)
         )
     """)
     print("+ Created table: icd10am_codes")
@@ -186,6 +195,19 @@ def create_database_v2():
     # Import new hierarchical ACHI data
     import_hierarchical_achi_data(cursor)
     
+    # Keep the validation history the API recorded in the previous database
+    if backup_path:
+        conn.commit()
+        carry_over_history(conn, backup_path)
+    
+    print("\n" + "=" * 80)
+    print("BUILDING SEARCH INDEXES...")
+    print("=" * 80)
+    
+    # Search indexes and derived columns, as schema migrations (must run after all imports)
+    apply_migrations(conn)
+    stamp_dataset_version(cursor)
+    
     conn.commit()
     conn.close()
     
@@ -197,7 +219,31 @@ def create_database_v2():
     print("  - Original: icd10am_codes, achi_codes, code_blocks, icd10_main_categories")
     print("  - New: achi_main_categories, achi_sub_categories, achi_codes_v2")
     print("  - Mapping: icd_achi_category_mapping")
-    print("  - Logging: valid_relationships, validation_test_log")
+    print("  - Search: achi_search, icd10am_codes_fts, achi_codes_v2_fts, search_vocabulary, search_trigrams")
+    print("  - Logging: valid_relationships, validation_test_log, code_usage")
+    print("  - Metadata: dataset_metadata, schema_version")
+
+# Tables the running API writes to; a rebuild copies their rows from the backup
+HISTORY_TABLES = ['validation_test_log', 'valid_relationships']
+
+def carry_over_history(conn, backup_path):
+    """Copy HISTORY_TABLES rows from the previous database (columns both versions have)"""
+    conn.execute("ATTACH DATABASE ? AS previous", (str(backup_path),))
+    try:
+        for table in HISTORY_TABLES:
+            old_columns = [row[1] for row in conn.execute(f"PRAGMA previous.table_info({table})")]
+            new_columns = {row[1] for row in conn.execute(f"PRAGMA main.table_info({table})")}
+            columns = ', '.join(column for column in old_columns if column in new_columns)
+            if not columns:
+                continue
+            cursor = conn.execute(f"""
+                INSERT OR IGNORE INTO main.{table} ({columns})
+                SELECT {columns} FROM previous.{table}
+            """)
+            print(f"+ Carried over {cursor.rowcount} {table} rows from {backup_path.name}")
+        conn.commit()
+    finally:
+        conn.execute("DETACH DATABASE previous")
 
 def import_original_data(cursor, project_root):
     """Import original Excel data"""
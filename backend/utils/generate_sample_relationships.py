@@ -7,11 +7,17 @@ import sqlite3
 import pandas as pd
 import json
 import os
+import sys
 from pathlib import Path
 from datetime import datetime
 from openai import OpenAI
 from dotenv import load_dotenv
 
+# Add backend directory to path for shared schema helpers
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.schema import build_icd_category_column, has_icd_category_column
+
 # Load environment variables
 load_dotenv()
 
@@ -29,6 +35,11 @@ class SampleRelationshipGenerator:
         
         self.conn = sqlite3.connect(str(self.db_path))
         self.conn.row_factory = sqlite3.Row
+        
+        # Category sampling joins on icd10am_codes.category_id; older builds get it resolved once
+        if not has_icd_category_column(self.conn):
+            build_icd_category_column(self.conn.cursor())
+            self.conn.commit()
     
     def _discover_all_categories(self):
         """
@@ -64,7 +75,7 @@ class SampleRelationshipGenerator:
             query = """
                 SELECT DISTINCT i.code, i.description
                 FROM icd10am_codes i
-                JOIN icd10_main_categories c ON c.code LIKE substr(i.code, 1, 3) || '%'
+                JOIN icd10_main_categories c ON c.id = i.category_id
                 WHERE c.description = ?
                 LIMIT ?
             """
@@ -0,0 +1,49 @@
+"""
+Database Migration Script
+Applies pending schema migrations to an existing validation.db in place,
+without re-importing the Excel files (safe while the API is running)
+
+Usage: python utils/migrate_database.py [--status] [path/to/validation.db]
+"""
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add backend directory to path for shared schema helpers
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.migrations import LATEST_VERSION, MIGRATIONS, applied_versions, apply_migrations
+
+def migrate_database(db_path: Path, status_only: bool = False):
+    """Print the migration status of db_path and apply what is pending"""
+    if not db_path.exists():
+        print(f"Database not found at: {db_path}")
+        return
+
+    conn = sqlite3.connect(str(db_path))
+    try:
+        applied = applied_versions(conn)
+        print(f"Database: {db_path}")
+        print(f"Schema version: {max(applied, default=0)} (latest {LATEST_VERSION})")
+        for version, name, _ in MIGRATIONS:
+            state = f"applied {applied[version]}" if version in applied else "pending"
+            print(f"  {version:>3}  {name:<32} {state}")
+
+        if status_only:
+            return
+        if len(applied) == len(MIGRATIONS):
+            print("\nUp to date")
+            return
+
+        print("\nApplying migrations...")
+        names = apply_migrations(conn)
+        print(f"\n✓ Applied {len(names)} migration(s)")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    status_only = '--status' in args
+    paths = [arg for arg in args if arg != '--status']
+    db_path = Path(paths[0]) if paths else Path(__file__).parent.parent / 'data' / 'validation.db'
+    migrate_database(db_path, status_only)
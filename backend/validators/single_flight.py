@@ -0,0 +1,123 @@
+"""
+Single-Flight Calls
+Concurrent calls for the same key share one execution and its result
+"""
+import asyncio
+import threading
+from typing import Awaitable, Callable, Dict, Hashable
+
+class _Call:
+    """One in-flight execution and the callers waiting on it"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class _AsyncCall:
+    """One in-flight coroutine: its shared future and the callers waiting on it"""
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls (thread-safe)
+
+    The first caller for a key runs the function; callers arriving before it
+    returns block until it does and get the same result (or exception). Once
+    it returns the key is free again, so later calls run anew (results are
+    kept by the caches, not here). do() serves threads, ado() coroutines on
+    one event loop; the two don't share calls with each other. If an ado()
+    leader is cancelled its waiters retry rather than fail with it.
+    """
+    def __init__(self):
+        self.calls = {}
+        self.async_calls = {}
+        self.lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Dict]) -> Dict:
+        """fn() for the first caller with key, its shared result for the rest (dicts are copied)"""
+        with self.lock:
+            call = self.calls.get(key)
+            if call is None:
+                call = self.calls[key] = _Call()
+                leader = True
+                self.executed += 1
+            else:
+                leader = False
+                call.waiters += 1
+                self.coalesced += 1
+                self.max_waiters = max(self.max_waiters, call.waiters)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return dict(call.result)
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Dict]]) -> Dict:
+        """await fn() for the first caller with key, its shared result for the rest (dicts are copied)"""
+        while True:
+            with self.lock:
+                call = self.async_calls.get(key)
+                if call is None:
+                    call = self.async_calls[key] = _AsyncCall(asyncio.get_running_loop().create_future())
+                    leader = True
+                    self.executed += 1
+                else:
+                    leader = False
+                    call.waiters += 1
+                    self.coalesced += 1
+                    self.max_waiters = max(self.max_waiters, call.waiters)
+
+            if not leader:
+                try:
+                    # A waiter giving up (client disconnect) must not cancel the shared call
+                    return dict(await asyncio.shield(call.future))
+                except asyncio.CancelledError:
+                    if asyncio.current_task().cancelling() or not call.future.cancelled():
+                        raise
+                    # Only the leader was cancelled: try again, leading if the key is free
+                    continue
+
+            try:
+                result = await fn()
+                call.future.set_result(result)
+                return result
+            except BaseException as e:
+                if isinstance(e, asyncio.CancelledError):
+                    call.future.cancel()
+                else:
+                    call.future.set_exception(e)
+                    call.future.exception()  # retrieved: no "never retrieved" warning without waiters
+                raise
+            finally:
+                with self.lock:
+                    del self.async_calls[key]
+
+    def stats(self) -> Dict:
+        """Executions, calls saved by sharing one, and keys in flight now"""
+        with self.lock:
+            requests = self.executed + self.coalesced
+            return {
+                'in_flight': len(self.calls) + len(self.async_calls),
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'max_waiters': self.max_waiters,
+                'saved_rate': round(self.coalesced / requests, 4) if requests else 0.0
+            }
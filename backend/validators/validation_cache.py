@@ -0,0 +1,204 @@
+"""
+Validation Cache
+Bounded LRU cache of validation results with expiry by result source, and a
+persistent tier in the database shared by workers and kept across restarts
+"""
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+# Seconds a cached result stays valid, by its 'source' (None: until evicted,
+# 0: never cached). Exact database matches only change with the database;
+# AI verdicts are re-asked now and then so model/prompt changes reach them,
+# pure inference (no grounding examples) sooner.
+SOURCE_TTLS = {
+    'database_exact': None,
+    'ai_with_examples': int(os.getenv('VALIDATION_CACHE_TTL_EXAMPLES', 7 * 24 * 3600)),
+    'ai_inference': int(os.getenv('VALIDATION_CACHE_TTL_INFERENCE', 24 * 3600)),
+    'error': 0,
+}
+DEFAULT_TTL = 3600
+
+# Sources worth persisting: AI verdicts cost an LLM round trip. Exact matches
+# are one indexed query and follow the database, so they stay in memory only.
+PERSISTED_SOURCES = ('ai_with_examples', 'ai_inference')
+
+def _result_size(key: str, result: Dict) -> int:
+    """Approximate memory held by one entry (dict, keys and values)"""
+    return sys.getsizeof(key) + sys.getsizeof(result) + sum(
+        sys.getsizeof(field) + sys.getsizeof(value) for field, value in result.items()
+    )
+
+class ValidationCache:
+    """
+    Thread-safe cache of validation results keyed by ICD/ACHI pair
+
+    Bounded by entry count and by approximate memory; the least recently
+    used entries are evicted first. Expired entries are dropped when looked
+    up (or evicted as LRU).
+    """
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024,
+                 ttls: Optional[Dict[str, Optional[int]]] = None, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = SOURCE_TTLS if ttls is None else ttls
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.skipped = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Cached result for key (a copy), or None on a miss or expiry"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry['expires'] is not None and entry['expires'] <= self.clock():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry['result'])
+
+    def put(self, key: str, result: Dict, expires_in: Optional[float] = None):
+        """
+        Cache a result under the TTL for its source (ttl 0: not cached)
+        expires_in: seconds the result has left elsewhere (a persisted copy);
+        caps the TTL so it isn't restarted
+        """
+        ttl = self.ttls.get(result.get('source'), DEFAULT_TTL)
+        if expires_in is not None:
+            ttl = expires_in if ttl is None else min(ttl, expires_in)
+        if ttl is not None and ttl <= 0:
+            with self.lock:
+                self.skipped += 1
+            return
+
+        size = _result_size(key, result)
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = {
+                'result': dict(result),
+                'expires': None if ttl is None else self.clock() + ttl,
+                'size': size
+            }
+            self.bytes += size
+            while self.entries and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+                oldest = next(iter(self.entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        self.bytes -= self.entries.pop(key)['size']
+
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self) -> Dict:
+        """Size and hit/miss/expiry/eviction counters for monitoring"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'expirations': self.expirations,
+                'evictions': self.evictions,
+                'not_cached': self.skipped,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+class PersistentValidationCache:
+    """
+    Validation results stored in the database (validation_result_cache)
+
+    Keyed by ICD/ACHI pair, model and prompt version, so every API worker
+    shares it and it survives restarts, while a model or prompt change makes
+    old results miss instead of being served. Expiry follows SOURCE_TTLS.
+    """
+    def __init__(self, db, model: str, prompt_version: str, ttls: Optional[Dict[str, Optional[int]]] = None,
+                 sources=PERSISTED_SOURCES):
+        self.db = db
+        self.model = model
+        self.prompt_version = prompt_version
+        self.ttls = SOURCE_TTLS if ttls is None else ttls
+        self.sources = sources
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.errors = 0
+
+    def get(self, icd_code: str, achi_code: str) -> Optional[Tuple[Dict, Optional[float]]]:
+        """
+        Stored result for the pair and the seconds it has left (None: no
+        expiry), or None (a failed read counts as a miss)
+        """
+        try:
+            stored = self.db.get_cached_validation(icd_code, achi_code, self.model, self.prompt_version)
+        except Exception as e:
+            print(f"[CACHE WARNING] Failed to read validation cache: {e}")
+            stored = None
+            with self.lock:
+                self.errors += 1
+        with self.lock:
+            if stored is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        result, expires_at = stored
+        return result, None if expires_at is None else expires_at - time.time()
+
+    def put(self, icd_code: str, achi_code: str, result: Dict):
+        """Store a result if its source is persisted (failures are logged, not raised)"""
+        source = result.get('source')
+        ttl = self.ttls.get(source, DEFAULT_TTL)
+        if source not in self.sources or ttl == 0:
+            return
+        try:
+            stored = self.db.store_cached_validation(
+                icd_code, achi_code, self.model, self.prompt_version, result, ttl
+            )
+        except Exception as e:
+            print(f"[CACHE WARNING] Failed to store validation result: {e}")
+            with self.lock:
+                self.errors += 1
+            return
+        if stored:
+            with self.lock:
+                self.stores += 1
+
+    def stats(self) -> Dict:
+        """Hit/miss/store counters for monitoring"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'model': self.model,
+                'prompt_version': self.prompt_version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'errors': self.errors,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }